@@ -2,29 +2,49 @@ import atexit
 import logging
 
 import falcon
+from pymongo import monitoring
 
 from am.controller import FileController
 from am.managers import WorkerManager
-from am.middleware import RequireAuthGroups
+from am.middleware import RequireAuthGroups, StoreCallsReport, RequestMetrics, RequestProfiler
 from am.routes import AssetCreate, AssetList, AssetUpload, WorkersStatusRoute, ObjectInfo, AuthRoute, UserEdit, UserInfo, GroupsInfo, ProjectAccessMetaEdit, WorkerQueue
 from am.routes import WorkersEdit, StoreList, AssetMetaEdit, ProjectCreate, ProjectList, ObjectEdit, TagEdit, ProjectMetaEdit, FileList, ProjectVersion
+from am.routes import ObjectsInfo, MetricsRoute, ProfileList, ProfileInfo, AssetBatch
 from common.auth import AuthManager, AuthMiddleware
-from common.consts import DEFAULT_CREDENTIALS_CONFIG, DEFAULT_AUTH_CONFIG, DEFAULT_WORKER_CONFIG
+from common.consts import DEFAULT_CREDENTIALS_CONFIG, DEFAULT_AUTH_CONFIG, DEFAULT_WORKER_CONFIG, CONFIG_STORE_CALLS_LOG, CONFIG_STORE_CALLS_HEADER
+from common.consts import CONFIG_PROFILING_SAMPLE_RATE, CONFIG_PROFILING_THRESHOLD, CONFIG_PROFILING_TOP, CONFIG_PROFILING_KEEP
 from common.errors import handle_exceptions
-from common.middleware import RequireJSON, CORSComponent
+from common.metrics import MongoCommandStats
+from common.middleware import RequireJSON, CORSComponent, ConditionalGet
 from common.util import parse_logging_lvl
 
 
 def setup_app(logging_level: str = "debug", credentials_config: str = DEFAULT_CREDENTIALS_CONFIG, auth_config: str = DEFAULT_AUTH_CONFIG,
-              worker_config: str = DEFAULT_WORKER_CONFIG) -> falcon.API:
+              worker_config: str = DEFAULT_WORKER_CONFIG, store_type: str = "s3") -> falcon.API:
     logging.basicConfig(level=parse_logging_lvl(logging_level), format='[%(asctime)s] [%(levelname)s] %(message)s')
 
-    file_controller = FileController(config_file=credentials_config)
+    # the listener only applies to the mongo clients created after it was registered
+    mongo_stats = MongoCommandStats()
+    monitoring.register(mongo_stats)
+
+    file_controller = FileController(store_type=store_type, config_file=credentials_config)
     worker_manager = WorkerManager(config_file=worker_config, controller=file_controller)
 
     auth = AuthManager(config_file=auth_config)
 
-    app = falcon.API(middleware=[RequireJSON(), CORSComponent(), AuthMiddleware(auth=auth, public_paths={"/api/auth"}), RequireAuthGroups(controller=file_controller)])
+    profiling_config = file_controller.profiling_config()
+    profiler = RequestProfiler(sample_rate=profiling_config.get(CONFIG_PROFILING_SAMPLE_RATE, 0.0), threshold=profiling_config.get(CONFIG_PROFILING_THRESHOLD, 0.0),
+                               top=profiling_config.get(CONFIG_PROFILING_TOP, 40), keep=profiling_config.get(CONFIG_PROFILING_KEEP, 50))
+
+    middleware = [RequireJSON(), CORSComponent(), ConditionalGet(), AuthMiddleware(auth=auth, public_paths={"/api/auth"}), profiler, RequireAuthGroups(controller=file_controller)]
+    store_calls_config = file_controller.store_calls_config()
+    if store_calls_config.get(CONFIG_STORE_CALLS_LOG, False) or store_calls_config.get(CONFIG_STORE_CALLS_HEADER, False):
+        middleware.insert(0, StoreCallsReport(log=store_calls_config.get(CONFIG_STORE_CALLS_LOG, False),
+                                              header=store_calls_config.get(CONFIG_STORE_CALLS_HEADER, False)))
+    request_metrics = RequestMetrics()
+    middleware.insert(0, request_metrics)
+
+    app = falcon.API(middleware=middleware)
 
     app.add_route('/api/auth', AuthRoute(auth=auth))
     app.add_route('/api/user', UserEdit(auth=auth))
@@ -33,6 +53,10 @@ def setup_app(logging_level: str = "debug", credentials_config: str = DEFAULT_CR
     app.add_route('/api/workers', WorkersEdit(worker_manager=worker_manager))
     app.add_route('/api/workers/status', WorkersStatusRoute(worker_manager=worker_manager))
     app.add_route('/api/workers/queue', WorkerQueue(controller=file_controller, worker_manager=worker_manager))
+    app.add_route('/api/metrics', MetricsRoute(controller=file_controller, worker_manager=worker_manager, auth=auth, request_metrics=request_metrics,
+                                               mongo_stats=mongo_stats))
+    app.add_route('/api/profiles', ProfileList(profiler=profiler))
+    app.add_route('/api/profiles/{profile_id}', ProfileInfo(profiler=profiler))
     app.add_route('/api/list', StoreList(controller=file_controller))
     app.add_route('/api/{store_id}/list', ProjectList(controller=file_controller))
     app.add_route('/api/{store_id}/create', ProjectCreate(controller=file_controller))
@@ -44,10 +68,12 @@ def setup_app(logging_level: str = "debug", credentials_config: str = DEFAULT_CR
     # had to redo the routes because the falcon parser cannot parse routes with the same prefix
     app.add_route('/api/{store_id}/{project_id}/object/{object_id}', ObjectEdit(controller=file_controller))
     app.add_route('/api/{store_id}/{project_id}/object/{object_id}/info', ObjectInfo(controller=file_controller))
+    app.add_route('/api/{store_id}/{project_id}/objects', ObjectsInfo(controller=file_controller))
     app.add_route('/api/{store_id}/{project_id}/files/{asset_id}', FileList(controller=file_controller))
     app.add_route('/api/{store_id}/{project_id}/meta/{asset_id}', AssetMetaEdit(controller=file_controller))
     app.add_route('/api/{store_id}/{project_id}/upload/{asset_id}', AssetUpload(controller=file_controller))
     app.add_route('/api/{store_id}/{project_id}/tags/{asset_id}', TagEdit(controller=file_controller))
+    app.add_route('/api/{store_id}/{project_id}/batch', AssetBatch(controller=file_controller))
 
     app.add_error_handler(Exception, handle_exceptions)
 
@@ -1,10 +1,13 @@
 # Module to allow connection to interpret connection to different store types
 # Additonally acts as a transformer for multiple s3 APIs including Minio and AWS implementations
-from typing import Dict, Union, Callable, List
+from typing import Dict, Union, Callable, List, Any
 
 from common.consts import DEFAULT_CREDENTIALS_CONFIG
 from common.entities import OveAssetMeta, OveProjectMeta, OveProjectAccessMeta, UserAccessMeta
 from common.errors import AssetExistsError, ObjectExistsError, ProjectExistsError
+from common.fsmanager import FSManager
+from common.metrics import Histogram
+from common.s3memory import create_memory_client
 from common.s3minio import S3Manager
 
 _RESERVED_NAMES = {"list", "validate", "create", "new"}
@@ -15,6 +18,13 @@ class FileController:
         if store_type == "s3":
             self._manager = S3Manager()
             self._manager.load(config_file=config_file)
+        elif store_type == "fs":
+            self._manager = FSManager()
+            self._manager.load(config_file=config_file)
+        elif store_type == "memory":
+            # the s3 backend running against in-memory stores, for benchmarks and local testing
+            self._manager = S3Manager(client_factory=create_memory_client)
+            self._manager.load(config_file=config_file)
         else:
             raise ValueError("Invalid store type provided")
 
@@ -24,16 +34,49 @@ class FileController:
     def list_stores(self):
         return self._manager.list_stores()
 
+    def cache_stats(self) -> Dict:
+        return self._manager.cache_stats()
+
+    def pool_stats(self) -> Dict:
+        return self._manager.pool_stats()
+
+    def store_call_stats(self) -> Dict:
+        return self._manager.store_call_stats()
+
+    def store_call_latency(self) -> Histogram:
+        return self._manager.store_call_latency()
+
+    def store_calls_config(self) -> Dict:
+        return self._manager.store_calls_config()
+
+    def profiling_config(self) -> Dict:
+        return self._manager.profiling_config()
+
+    def set_invalidation_publisher(self, publisher: Callable[[str, str, str], None]) -> None:
+        self._manager.set_invalidation_publisher(publisher)
+
+    def apply_invalidation(self, store: str, project_id: str, key: str) -> None:
+        self._manager.apply_invalidation(store=store, project_id=project_id, key=key)
+
+    def reset_caches(self) -> None:
+        self._manager.reset_caches()
+
+    def map_batch(self, fn: Callable, items: List, store_id: str = None) -> List:
+        return self._manager.map_batch(fn, items, store_id=store_id)
+
     # List the projects in an storage (returning the names)
     def list_projects(self, access: UserAccessMeta, store_id: str = None, metadata: bool = False, result_filter: Callable = None) -> List[Dict]:
         return self._manager.list_projects(store_id=store_id, metadata=metadata, result_filter=result_filter, access=access)
 
-    def list_assets(self, project_id: str, store_id: str = None, result_filter: Callable = None) -> List[Dict]:
-        return self._manager.list_assets(store_id=store_id, project_id=project_id, result_filter=result_filter)
+    def list_assets(self, project_id: str, store_id: str = None, result_filter: Callable = None, refresh: bool = False) -> List[Dict]:
+        return self._manager.list_assets(store_id=store_id, project_id=project_id, result_filter=result_filter, refresh=refresh)
 
     def list_files(self, project_id: str, asset_id: str, store_id: str = None, version: str = None) -> List[Dict]:
         return self._manager.list_files(store_id=store_id, project_id=project_id, asset_id=asset_id, version=version)
 
+    def list_files_page(self, project_id: str, asset_id: str, store_id: str = None, version: str = None, limit: int = None, cursor: str = None) -> Dict:
+        return self._manager.list_files_page(store_id=store_id, project_id=project_id, asset_id=asset_id, version=version, limit=limit, cursor=cursor)
+
     def create_project(self, project_id: str, store_id: str = None) -> None:
         # To avoid confusion, we reserve certain names for projects
         if project_id in _RESERVED_NAMES:
@@ -55,19 +98,24 @@ class FileController:
 
     def upload_asset(self, project_id: str, asset_id: str, filename: str, meta: OveAssetMeta, upload_filename: str, store_id: str = None,
                      update: bool = False) -> None:
-        meta.filename = filename
-        if update:
-            meta.update()
-        else:
-            meta.uploaded = True
-            meta.upload()
-
+        _prepare_upload(meta=meta, filename=filename, update=update)
         self._manager.upload_asset(store_id=store_id, project_id=project_id, asset_id=asset_id, filename=meta.file_location,
                                    upload_filename=upload_filename)
         self._manager.set_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, meta=meta)
 
-    def get_project_meta(self, project_id: str, store_id: str = None) -> OveProjectMeta:
-        return self._manager.get_project_meta(store_id=store_id, project_id=project_id, ignore_errors=True)
+    def upload_asset_stream(self, project_id: str, asset_id: str, filename: str, meta: OveAssetMeta, stream: Any, length: int, store_id: str = None,
+                            update: bool = False) -> None:
+        _prepare_upload(meta=meta, filename=filename, update=update)
+        self._manager.upload_asset_stream(store_id=store_id, project_id=project_id, asset_id=asset_id, filename=meta.file_location,
+                                          stream=stream, length=length)
+        self._manager.set_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, meta=meta)
+
+    # use_cache=False for the reads followed by a write, so a cached copy does not undo the writes of the other processes
+    def get_project_meta(self, project_id: str, store_id: str = None, use_cache: bool = True) -> OveProjectMeta:
+        return self._manager.get_project_meta(store_id=store_id, project_id=project_id, ignore_errors=True, use_cache=use_cache)
+
+    def describe_project(self, project_id: str, access: UserAccessMeta, store_id: str = None) -> Dict:
+        return self._manager.describe_project(store_id=store_id, project_id=project_id, access=access)
 
     def edit_project_meta(self, project_id: str, meta: OveProjectMeta, store_id: str = None) -> None:
         self._manager.set_project_meta(project_id=project_id, meta=meta, store_id=store_id, ignore_errors=False)
@@ -81,12 +129,16 @@ class FileController:
     def has_access(self, project_id: str, groups: List[str], is_admin: bool, store_id: str = None) -> bool:
         return self._manager.has_access(store_id=store_id, project_id=project_id, groups=groups, is_admin=is_admin)
 
-    def get_asset_meta(self, project_id: str, asset_id: str, store_id: str = None) -> OveAssetMeta:
-        return self._manager.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id)
+    def get_asset_meta(self, project_id: str, asset_id: str, store_id: str = None, use_cache: bool = True) -> OveAssetMeta:
+        return self._manager.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, use_cache=use_cache)
 
     def edit_asset_meta(self, project_id: str, asset_id: str, meta: OveAssetMeta, store_id: str = None) -> None:
         self._manager.set_asset_meta(project_id=project_id, asset_id=asset_id, meta=meta, store_id=store_id)
 
+    # Returns the errors of the assets that could not be saved
+    def edit_asset_metas(self, project_id: str, metas: Dict[str, OveAssetMeta], store_id: str = None) -> Dict[str, Exception]:
+        return self._manager.set_asset_metas(project_id=project_id, metas=metas, store_id=store_id)
+
     def has_object(self, project_id: str, object_id: str, store_id: str = None) -> bool:
         return self._manager.has_object(store_id=store_id, project_id=project_id, object_id=object_id)
 
@@ -96,6 +148,9 @@ class FileController:
     def get_object_info(self, project_id: str, object_id: str, store_id: str = None) -> Union[None, Dict]:
         return self._manager.get_object_info(store_id=store_id, project_id=project_id, object_id=object_id)
 
+    def get_objects_info(self, project_id: str, object_ids: List[str], store_id: str = None) -> List[Dict]:
+        return self._manager.get_objects_info(store_id=store_id, project_id=project_id, object_ids=object_ids)
+
     def set_object(self, project_id: str, object_id: str, object_data: Dict, store_id: str = None, update: bool = False) -> None:
         if not update and self._manager.has_object(store_id=store_id, project_id=project_id, object_id=object_id):
             raise ObjectExistsError(store_id=store_id, project_id=project_id, object_id=object_id)
@@ -104,3 +159,12 @@ class FileController:
 
     def project_type(self, store_id: str, project_id: str) -> str:
         return self._manager.project_type(store_id=store_id, project_id=project_id)
+
+
+def _prepare_upload(meta: OveAssetMeta, filename: str, update: bool) -> None:
+    meta.filename = filename
+    if update:
+        meta.update()
+    else:
+        meta.uploaded = True
+        meta.upload()
@@ -14,6 +14,7 @@ from am import FileController
 from common.consts import *
 from common.entities import OveAssetMeta, TaskStatus, UserAccessMeta
 from common.errors import MissingParameterError, WorkerNotFoundError
+from common.invalidation import InvalidationBus, setup_invalidation_collection
 from common.util import is_empty_str
 
 VALIDATION_WORKER = {"$jsonSchema": {
@@ -130,6 +131,7 @@ class WorkerManager:
         self._client = None
         self._worker_collection = None
         self._worker_queue = None
+        self._invalidation_bus = None
 
         self._controller = controller
 
@@ -153,6 +155,16 @@ class WorkerManager:
                 self._worker_queue = self.setup(db_name=mongo_config.get(CONFIG_MONGO_DB),
                                                 collection_name=mongo_config.get(CONFIG_MONGO_QUEUE_COLLECTION),
                                                 validator=VALIDATION_QUEUE, ttl_index="endTime")
+
+                # keeps the store caches of all the AM processes (and nodes) in sync
+                invalidation_collection = setup_invalidation_collection(db=self._client[mongo_config.get(CONFIG_MONGO_DB)],
+                                                                        collection_name=mongo_config.get(CONFIG_MONGO_INVALIDATION_COLLECTION,
+                                                                                                         DEFAULT_INVALIDATION_COLLECTION))
+                if invalidation_collection is not None:
+                    self._invalidation_bus = InvalidationBus(collection=invalidation_collection, on_invalidate=self._controller.apply_invalidation,
+                                                             on_reset=self._controller.reset_caches)
+                    self._controller.set_invalidation_publisher(self._invalidation_bus.publish)
+                    self._invalidation_bus.start()
                 logging.info("Loaded worker config...")
         except:
             logging.error("Error while trying to load worker config. Error: %s", sys.exc_info()[1])
@@ -176,6 +188,11 @@ class WorkerManager:
 
         return [_format(w) for w in self._worker_queue.find({}, {"credentials": 0}) if has_access(w)]
 
+    # Number of tasks in the queue by (workerType, status)
+    def queue_depth(self) -> Dict[Tuple[str, str], int]:
+        groups = self._worker_queue.aggregate([{"$group": {"_id": {"workerType": "$workerType", "status": "$status"}, "count": {"$sum": 1}}}])
+        return {(g["_id"].get("workerType", ""), g["_id"].get("status", "")): g["count"] for g in groups}
+
     def schedule_task(self, store_id: str, project_id: str, meta: OveAssetMeta, worker_type: str, username: str, store_config: Dict, task_options: Dict, priority: int):
         filename = task_options.get("filename", meta.filename)
         if filename is None or len(filename) == 0:
@@ -219,6 +236,8 @@ class WorkerManager:
             return db[collection_name]
 
     def close(self):
+        if self._invalidation_bus:
+            self._invalidation_bus.close()
         if self._client:
             self._client.close()
 
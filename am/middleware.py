@@ -1,10 +1,143 @@
+import cProfile
+import datetime
+import io
 import logging
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Union
 
 import falcon
 
 from am import FileController
 from common.consts import HTTP_READ_METHODS, HTTP_IGNORE_METHODS, HTTP_WRITE_METHODS
 from common.entities import UserAccessMeta
+from common.metrics import Histogram
+from common.storecalls import start_recording, stop_recording
+
+
+class RequestMetrics:
+    # Measures the latency of every request by route, this should be the first middleware so the whole processing time is included
+    def __init__(self):
+        self.latency = Histogram()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self) -> dict:
+        with self._lock:
+            return dict(self._in_flight)
+
+    def process_request(self, req: falcon.Request, _resp: falcon.Response):
+        req.context.metrics_start = time.perf_counter()
+
+    # the route is only known after routing, the requests not matching any route are not counted as in flight
+    def process_resource(self, req: falcon.Request, _resp: falcon.Response, _resource, _params):
+        key = (req.method, req.uri_template)
+        with self._lock:
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        req.context.metrics_in_flight = key
+
+    def process_response(self, req: falcon.Request, resp: falcon.Response, _resource, _req_succeeded):
+        start = req.context.get("metrics_start", None)
+        if start is None:
+            return
+
+        key = req.context.get("metrics_in_flight", None)
+        if key is not None:
+            with self._lock:
+                self._in_flight[key] -= 1
+
+        self.latency.observe((req.method, req.uri_template or "unmatched", resp.status.split(" ", 1)[0]), time.perf_counter() - start)
+
+
+class RequestProfiler:
+    # Runs the requests under cProfile when an admin sends the X-Profile header, or for a sample of the requests.
+    # The sampled requests are kept only if they are slower than `threshold` seconds, the last `keep` profiles are kept in memory.
+    def __init__(self, sample_rate: float = 0.0, threshold: float = 0.0, top: int = 40, keep: int = 50):
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.top = top
+        self.keep = keep
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def list_profiles(self) -> List[Dict]:
+        with self._lock:
+            return [{k: v for k, v in profile.items() if k != "stats"} for profile in reversed(self._profiles.values())]
+
+    def get_profile(self, profile_id: str) -> Union[Dict, None]:
+        with self._lock:
+            return self._profiles.get(profile_id, None)
+
+    # the profiler starts after the authentication, so the admin access can be checked
+    def process_resource(self, req: falcon.Request, _resp: falcon.Response, _resource, _params):
+        if getattr(req, "user_access", UserAccessMeta()).admin_access and req.get_header("X-Profile", default="") not in {"", "0", "false"}:
+            trigger = "header"
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            trigger = "sample"
+        else:
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # only one profiler can be active at a time on python 3.12+
+            logging.debug("Skipped the profiling of %s %s, another request is being profiled", req.method, req.path)
+            return
+
+        req.context.profile = profile
+        req.context.profile_trigger = trigger
+        req.context.profile_start = time.perf_counter()
+
+    def process_response(self, req: falcon.Request, resp: falcon.Response, _resource, _req_succeeded):
+        profile = req.context.get("profile", None)
+        if profile is None:
+            return
+
+        profile.disable()
+        duration = time.perf_counter() - req.context.profile_start
+        trigger = req.context.profile_trigger
+        if trigger == "sample" and duration < self.threshold:
+            return
+
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(self.top)
+
+        profile_id = uuid.uuid4().hex
+        with self._lock:
+            self._profiles[profile_id] = {"id": profile_id, "date": "{0:%Y-%m-%d %H:%M:%S}".format(datetime.datetime.now()), "method": req.method,
+                                          "path": req.path, "route": req.uri_template, "status": resp.status, "duration": duration,
+                                          "trigger": trigger, "stats": output.getvalue()}
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+
+        resp.set_header("X-Profile-Id", profile_id)
+        logging.info("Profiled %s %s in %.1f ms, profile id: %s", req.method, req.path, duration * 1000, profile_id)
+
+
+class StoreCallsReport:
+    # Reports the store calls made by every request, this should be the first middleware so the other middleware calls are included
+    def __init__(self, log: bool = True, header: bool = False):
+        self.log = log
+        self.header = header
+
+    def process_request(self, _req: falcon.Request, _resp: falcon.Response):
+        start_recording()
+
+    def process_response(self, req: falcon.Request, resp: falcon.Response, _resource, _req_succeeded):
+        recording = stop_recording()
+        if recording is None:
+            return
+
+        summary = recording.summary()
+        if self.log:
+            logging.info("%s %s store calls: %s", req.method, req.path, summary)
+        if self.header:
+            resp.set_header("X-Store-Calls", summary)
 
 
 class RequireAuthGroups:
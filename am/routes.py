@@ -3,18 +3,24 @@
 # Author: David Akroyd
 # Contributor: Ovidiu Serban
 import datetime
+import logging
+import sys
+from collections import OrderedDict
 from functools import partial
-from typing import List
+from typing import Any, Dict, List, Tuple, Union
 
 import falcon
 
 from am.controller import FileController
 from am.managers import WorkerManager
+from am.middleware import RequestMetrics, RequestProfiler
 from common.auth import AuthManager
+from common.consts import MAX_BATCH_OPERATIONS
 from common.entities import OveAssetMeta, OveProjectMeta, UserAccessMeta, OveProjectAccessMeta
-from common.errors import InvalidAssetError, ValidationError, MissingParameterError
-from common.falcon_utils import unquote_filename, save_filename
+from common.errors import InvalidAssetError, InvalidNameError, ValidationError, MissingParameterError, InvalidDataError, to_http_error
+from common.falcon_utils import unquote_filename, save_stream
 from common.filters import build_meta_filter, DEFAULT_FILTER
+from common.metrics import MetricsWriter, MongoCommandStats, CONTENT_TYPE_PROMETHEUS
 from common.util import to_bool
 from common.validation import validate_not_null, validate_no_slashes, validate_list
 
@@ -213,6 +219,93 @@ class WorkerQueue:
         resp.status = falcon.HTTP_200
 
 
+class MetricsRoute:
+    internal_group_validation = True
+
+    def __init__(self, controller: FileController, worker_manager: WorkerManager, auth: AuthManager, request_metrics: RequestMetrics,
+                 mongo_stats: MongoCommandStats):
+        self._controller = controller
+        self._auth = auth
+        self._worker_manager = worker_manager
+        self._request_metrics = request_metrics
+        self._mongo_stats = mongo_stats
+
+    def on_get(self, req: falcon.Request, resp: falcon.Response):
+        _validate_is_admin(req)
+
+        metrics = MetricsWriter()
+        metrics.histogram("request_duration_seconds", "Duration of the API requests", ("method", "route", "status"), self._request_metrics.latency)
+        metrics.gauge("requests_in_flight", "API requests being processed", ("method", "route"), self._request_metrics.in_flight())
+
+        operations = self._controller.store_call_stats()
+        metrics.histogram("store_call_duration_seconds", "Duration of the store calls", ("operation",), self._controller.store_call_latency())
+        metrics.counter("store_call_errors_total", "Failed store calls", ("operation",), {(op,): c["errors"] for op, c in operations.items()})
+        metrics.counter("store_call_bytes_total", "Bytes transferred by the store calls", ("operation",), {(op,): c["bytes"] for op, c in operations.items()})
+
+        pools = {store_id: stats for store_id, stats in self._controller.pool_stats().items() if "pools" in stats}
+        metrics.gauge("store_pool_max_size", "Maximum number of connections kept by each store pool", ("store",),
+                      {(store_id,): stats["maxPoolSize"] for store_id, stats in pools.items()})
+        metrics.gauge("store_pool_idle_connections", "Idle connections ready to be reused", ("store",),
+                      {(store_id,): stats["idle"] for store_id, stats in pools.items()})
+        metrics.counter("store_pool_connections_created_total", "Connections opened to the store", ("store",),
+                        {(store_id,): stats["connectionsCreated"] for store_id, stats in pools.items()})
+
+        caches = dict(self._controller.cache_stats(), **self._auth.cache_stats())
+        metrics.counter("cache_hits_total", "Cache hits", ("cache",), {(name,): stats["hits"] for name, stats in caches.items()})
+        metrics.counter("cache_misses_total", "Cache misses", ("cache",), {(name,): stats["misses"] for name, stats in caches.items()})
+        metrics.gauge("cache_hit_ratio", "Ratio of the cache lookups served from the cache", ("cache",),
+                      {(name,): stats["hitRatio"] for name, stats in caches.items()})
+        metrics.gauge("cache_entries", "Entries in the cache", ("cache",), {(name,): stats["size"] for name, stats in caches.items()})
+
+        metrics.histogram("mongo_command_duration_seconds", "Duration of the mongo commands", ("command", "collection"), self._mongo_stats.latency)
+        metrics.counter("mongo_command_failures_total", "Failed mongo commands", ("command", "collection"), self._mongo_stats.failures())
+
+        try:
+            queue_depth = self._worker_manager.queue_depth()
+        except:
+            logging.error("Error while trying to count the worker queue tasks. Error: %s", sys.exc_info()[1])
+            queue_depth = {}
+        metrics.gauge("worker_queue_tasks", "Tasks in the worker queue", ("workerType", "status"), queue_depth)
+
+        resp.content_type = CONTENT_TYPE_PROMETHEUS
+        resp.body = metrics.render()
+        resp.status = falcon.HTTP_200
+
+
+class ProfileList:
+    internal_group_validation = True
+
+    def __init__(self, profiler: RequestProfiler):
+        self._profiler = profiler
+
+    def on_get(self, req: falcon.Request, resp: falcon.Response):
+        _validate_is_admin(req)
+
+        resp.media = self._profiler.list_profiles()
+        resp.status = falcon.HTTP_200
+
+
+class ProfileInfo:
+    internal_group_validation = True
+
+    def __init__(self, profiler: RequestProfiler):
+        self._profiler = profiler
+
+    def on_get(self, req: falcon.Request, resp: falcon.Response, profile_id: str):
+        _validate_is_admin(req)
+
+        profile = self._profiler.get_profile(profile_id)
+        if profile is None:
+            raise falcon.HTTPNotFound(title="Profile not found", description="The profile '{}' was not kept or has expired".format(profile_id))
+
+        if req.params.get("format", None) == "text":
+            resp.content_type = falcon.MEDIA_TEXT
+            resp.body = profile["stats"]
+        else:
+            resp.media = profile
+        resp.status = falcon.HTTP_200
+
+
 class ProjectList:
     internal_group_validation = True
 
@@ -259,7 +352,7 @@ class ProjectCreate:
         self._controller.create_project(store_id=store_id, project_id=project_id)
         self._controller.edit_project_access_meta(store_id=store_id, project_id=project_id, meta=OveProjectAccessMeta(groups=project_groups))
 
-        meta = self._controller.get_project_meta(store_id=store_id, project_id=project_id)
+        meta = self._controller.get_project_meta(store_id=store_id, project_id=project_id, use_cache=False)
         meta.name = project_name
         self._controller.edit_project_meta(store_id=store_id, project_id=project_id, meta=meta)
 
@@ -268,27 +361,20 @@ class ProjectCreate:
 
 
 class ProjectMetaEdit:
+    conditional_get = True
+
     def __init__(self, controller: FileController):
         self._controller = controller
 
     def on_get(self, req: falcon.Request, resp: falcon.Response, store_id: str, project_id: str):
-        access = getattr(req, "user_access", None)
-
-        meta = self._controller.get_project_meta(store_id=store_id, project_id=project_id)
-        item = meta.to_public_json()
-        item["hasProject"] = self._controller.has_object(store_id=store_id, project_id=project_id, object_id="project")
-        item["projectType"] = self._controller.project_type(store_id=store_id, project_id=project_id)
-        item["access"] = self._controller.get_project_access_meta(store_id=store_id, project_id=project_id).groups
-        item["read_access"] = True
-        item["write_access"] = self._controller.has_access(store_id=store_id, project_id=project_id, groups=access.write_groups, is_admin=access.admin_access)
-
-        resp.media = item
+        access = getattr(req, "user_access", UserAccessMeta())
+        resp.media = self._controller.describe_project(store_id=store_id, project_id=project_id, access=access)
         resp.status = falcon.HTTP_200
 
     def on_post(self, req: falcon.Request, resp: falcon.Response, store_id: str, project_id: str):
         validate_not_null(req.media, 'name')
 
-        meta = self._controller.get_project_meta(store_id=store_id, project_id=project_id)
+        meta = self._controller.get_project_meta(store_id=store_id, project_id=project_id, use_cache=False)
 
         for field in OveProjectMeta.EDITABLE_FIELDS:
             if field in req.media:
@@ -325,7 +411,7 @@ class ProjectVersion:
         self._controller = controller
 
     def on_post(self, req: falcon.Request, resp: falcon.Response, store_id: str, project_id: str):
-        meta = self._controller.get_project_meta(store_id=store_id, project_id=project_id)
+        meta = self._controller.get_project_meta(store_id=store_id, project_id=project_id, use_cache=False)
 
         new_version = {
             'name': req.media['version_name'],
@@ -350,24 +436,44 @@ class ProjectVersion:
 
 
 class AssetList:
+    conditional_get = True
+
     def __init__(self, controller: FileController):
         self._controller = controller
 
     def on_get(self, req: falcon.Request, resp: falcon.Response, store_id: str, project_id: str):
         results_filter = build_meta_filter(req.params, default_filter=DEFAULT_FILTER)
-        resp.media = self._controller.list_assets(project_id=project_id, store_id=store_id, result_filter=results_filter)
+        refresh = to_bool(req.params.get("refresh", False))
+        resp.media = self._controller.list_assets(project_id=project_id, store_id=store_id, result_filter=results_filter, refresh=refresh)
         resp.status = falcon.HTTP_200
 
 
 class FileList:
+    conditional_get = True
+
     def __init__(self, controller: FileController):
         self._controller = controller
 
     def on_get(self, req: falcon.Request, resp: falcon.Response, store_id: str, project_id: str, asset_id: str):
-        resp.media = self._controller.list_files(project_id=project_id, store_id=store_id, asset_id=asset_id, version=req.params.get("version", None))
+        version = req.params.get("version", None)
+        if "limit" in req.params or "cursor" in req.params:
+            resp.media = self._controller.list_files_page(project_id=project_id, store_id=store_id, asset_id=asset_id, version=version,
+                                                          limit=_to_int(req.params.get("limit", None), name="limit"), cursor=req.params.get("cursor", None))
+        else:
+            resp.media = self._controller.list_files(project_id=project_id, store_id=store_id, asset_id=asset_id, version=version)
         resp.status = falcon.HTTP_200
 
 
+def _to_int(value: str, name: str) -> Union[int, None]:
+    if value is None:
+        return None
+
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError(title="Invalid {}".format(name), description="The {} parameter should be a number".format(name))
+
+
 class AssetCreate:
     def __init__(self, controller: FileController):
         self._controller = controller
@@ -400,7 +506,7 @@ class AssetUpload:
         update_asset = to_bool(req.params.get("update", "False"))
 
         try:
-            meta = self._controller.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id)
+            meta = self._controller.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, use_cache=False)
             if meta.uploaded and not update_asset:
                 raise falcon.HTTPBadRequest(title="Asset exists",
                                             description="This asset already has a file. If you wish to change this file, please update the asset.")
@@ -410,15 +516,19 @@ class AssetUpload:
             else:
                 raise falcon.HTTPBadRequest(title="Asset not found", description="You have not created this asset yet.")
 
-        up_fn = partial(self._controller.upload_asset, store_id=store_id, project_id=project_id, asset_id=asset_id, filename=filename, meta=meta,
+        up_fn = partial(self._controller.upload_asset_stream, store_id=store_id, project_id=project_id, asset_id=asset_id, filename=filename, meta=meta,
                         update=update_asset)
-        save_filename(up_fn, req)
+        up_file_fn = partial(self._controller.upload_asset, store_id=store_id, project_id=project_id, asset_id=asset_id, filename=filename, meta=meta,
+                             update=update_asset)
+        save_stream(up_fn, up_file_fn, req)
 
         resp.media = {'Asset': asset_id, 'Filename': filename}
         resp.status = falcon.HTTP_200
 
 
 class AssetMetaEdit:
+    conditional_get = True
+
     def __init__(self, controller: FileController):
         self._controller = controller
 
@@ -430,11 +540,8 @@ class AssetMetaEdit:
     def on_post(self, req: falcon.Request, resp: falcon.Response, store_id: str, project_id: str, asset_id: str):
         validate_not_null(req.media, 'name')
 
-        meta = self._controller.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id)
-
-        for field in OveAssetMeta.EDITABLE_FIELDS:
-            if field in req.media:
-                setattr(meta, field, req.media.get(field))
+        meta = self._controller.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, use_cache=False)
+        _update_asset_meta(meta, req.media)
 
         self._controller.edit_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, meta=meta)
 
@@ -454,7 +561,7 @@ class TagEdit:
     def on_post(self, req: falcon.Request, resp: falcon.Response, store_id: str, project_id: str, asset_id: str):
         validate_list(req.media)
 
-        meta = self._controller.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id)
+        meta = self._controller.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, use_cache=False)
         meta.tags = req.media
         self._controller.edit_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, meta=meta)
 
@@ -462,24 +569,10 @@ class TagEdit:
         resp.status = falcon.HTTP_200
 
     def on_patch(self, req: falcon.Request, resp: falcon.Response, store_id: str, project_id: str, asset_id: str):
-        validate_not_null(req.media, 'action')
-        validate_not_null(req.media, 'data')
-        validate_list(req.media.get('data'))
+        _validate_tags_patch(req.media)
 
-        action = req.media.get('action')
-        data = req.media.get('data')
-
-        if action not in ['add', 'remove']:
-            raise ValidationError(title="Invalid action provided", description="The action should be either add or remove")
-
-        meta = self._controller.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id)
-
-        new_tags = set(meta.tags)
-        if action == 'add':
-            new_tags.update(data)
-        elif action == 'remove':
-            new_tags.difference_update(data)
-        meta.tags = list(new_tags)
+        meta = self._controller.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, use_cache=False)
+        meta.tags = _patch_tags(meta.tags, action=req.media.get('action'), data=req.media.get('data'))
 
         self._controller.edit_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, meta=meta)
 
@@ -487,7 +580,7 @@ class TagEdit:
         resp.status = falcon.HTTP_200
 
     def on_delete(self, _: falcon.Request, resp: falcon.Response, store_id: str, project_id: str, asset_id: str):
-        meta = self._controller.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id)
+        meta = self._controller.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, use_cache=False)
         meta.tags = []
         self._controller.edit_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, meta=meta)
 
@@ -495,7 +588,160 @@ class TagEdit:
         resp.status = falcon.HTTP_200
 
 
+def _update_asset_meta(meta: OveAssetMeta, data: Dict) -> None:
+    for field in OveAssetMeta.EDITABLE_FIELDS:
+        if field in data:
+            setattr(meta, field, data.get(field))
+
+
+def _validate_tags_patch(data: Dict) -> None:
+    validate_not_null(data, 'action')
+    validate_not_null(data, 'data')
+    validate_list(data.get('data'))
+
+    if data.get('action') not in ['add', 'remove']:
+        raise ValidationError(title="Invalid action provided", description="The action should be either add or remove")
+
+
+def _patch_tags(tags: List[str], action: str, data: List[str]) -> List[str]:
+    new_tags = set(tags)
+    if action == 'add':
+        new_tags.update(data)
+    elif action == 'remove':
+        new_tags.difference_update(data)
+    return list(new_tags)
+
+
+class AssetBatch:
+    # the access is checked once for the whole batch, the read access is enough if the batch has only GET operations
+    internal_group_validation = True
+
+    def __init__(self, controller: FileController):
+        self._controller = controller
+
+    def on_post(self, req: falcon.Request, resp: falcon.Response, store_id: str, project_id: str):
+        operations = req.media
+        if not isinstance(operations, list) or not all(isinstance(operation, dict) for operation in operations):
+            raise InvalidDataError()
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            raise ValidationError(title="Too many operations", description="A batch can have at most {} operations".format(MAX_BATCH_OPERATIONS))
+
+        write = any(operation.get("method", "GET") != "GET" for operation in operations)
+        access = getattr(req, "user_access", UserAccessMeta())
+        if not self._controller.has_access(store_id=store_id, project_id=project_id, groups=access.write_groups if write else access.read_groups,
+                                           is_admin=access.admin_access):
+            raise falcon.HTTPUnauthorized(title='Access token required for {} operation'.format("WRITE" if write else "READ"),
+                                          description='Please provide a valid access token as part of the request.')
+
+        results = [None] * len(operations)
+        # the operations of the same asset are applied in order, the assets are processed concurrently
+        by_asset = OrderedDict()
+        for index, operation in enumerate(operations):
+            try:
+                _validate_batch_operation(operation)
+                by_asset.setdefault(operation["asset_id"], []).append((index, operation))
+            except Exception as ex:
+                results[index] = dict(asset_id=operation.get("asset_id", None), **_batch_error(ex))
+
+        # the edited metas are saved together, so the catalog and the project marker are updated once for the whole batch
+        edited = {}
+        for asset_id, asset_results, meta in self._controller.map_batch(partial(self._apply, store_id, project_id), list(by_asset.items()),
+                                                                        store_id=store_id):
+            for index, result in asset_results:
+                results[index] = result
+            if meta is not None:
+                edited[asset_id] = meta
+
+        errors = self._controller.edit_asset_metas(store_id=store_id, project_id=project_id, metas=edited) if edited else {}
+        for asset_id, ex in errors.items():
+            for index, operation in by_asset[asset_id]:
+                if operation.get("method", "GET") != "GET" and results[index]["status"] == 200:
+                    results[index] = dict(asset_id=asset_id, **_batch_error(ex))
+
+        resp.media = results
+        resp.status = falcon.HTTP_200
+
+    # Applies the operations of one asset on its meta, returning the edited meta if it has to be saved
+    def _apply(self, store_id: str, project_id: str,
+               item: Tuple[str, List[Tuple[int, Dict]]]) -> Tuple[str, List[Tuple[int, Dict]], Union[None, OveAssetMeta]]:
+        asset_id, operations = item
+        write = any(operation.get("method", "GET") != "GET" for _, operation in operations)
+        try:
+            meta = self._controller.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id, use_cache=not write)
+        except Exception as ex:
+            return asset_id, [(index, dict(asset_id=asset_id, **_batch_error(ex))) for index, _ in operations], None
+
+        results = []
+        edited = False
+        for index, operation in operations:
+            try:
+                result = _apply_batch_operation(meta, operation)
+                edited = edited or operation.get("method", "GET") != "GET"
+                results.append((index, {"asset_id": asset_id, "status": 200, "result": result}))
+            except Exception as ex:
+                results.append((index, dict(asset_id=asset_id, **_batch_error(ex))))
+        return asset_id, results, meta if edited else None
+
+
+_BATCH_OPERATIONS = {("meta", "GET"), ("meta", "POST"), ("tags", "GET"), ("tags", "POST"), ("tags", "PATCH"), ("tags", "DELETE")}
+
+
+# Checks a batch operation before it is grouped by asset, so an invalid operation only fails itself
+def _validate_batch_operation(operation: Dict) -> None:
+    validate_not_null(operation, "asset_id")
+    if not isinstance(operation["asset_id"], str):
+        raise InvalidNameError(name="asset_id")
+    validate_no_slashes(operation, "asset_id")
+
+    target = operation.get("target", None)
+    method = operation.get("method", "GET")
+    data = operation.get("data", None)
+    if (target, method) not in _BATCH_OPERATIONS:
+        raise ValidationError(title="Invalid operation", description="'{} {}' is not a valid batch operation".format(method, target))
+
+    if (target, method) in {("meta", "POST"), ("tags", "PATCH")} and not isinstance(data, dict):
+        raise InvalidDataError()
+
+    if target == "meta" and method == "POST":
+        validate_not_null(data, 'name')
+    elif method == "POST":
+        validate_list(data)
+    elif method == "PATCH":
+        _validate_tags_patch(data)
+
+
+# Applies a validated batch operation on the meta of its asset and returns the result of the operation
+def _apply_batch_operation(meta: OveAssetMeta, operation: Dict) -> Any:
+    target = operation.get("target", None)
+    method = operation.get("method", "GET")
+    data = operation.get("data", None)
+
+    if method == "GET":
+        pass
+    elif target == "meta":
+        _update_asset_meta(meta, data)
+    elif method == "POST":
+        meta.tags = data
+    elif method == "PATCH":
+        meta.tags = _patch_tags(meta.tags, action=data.get('action'), data=data.get('data'))
+    else:
+        meta.tags = []
+
+    return meta.to_public_json() if target == "meta" else meta.tags
+
+
+# The error of a batch operation, with the status and the message the single asset routes would return
+def _batch_error(ex: Exception) -> Dict:
+    if not isinstance(ex, (falcon.HTTPError, ValidationError)):
+        logging.error("Error while trying to apply a batch operation. Error: %s", ex)
+
+    error = to_http_error(ex)
+    return {"status": int(error.status.split(" ", 1)[0]), "title": error.title, "description": error.description}
+
+
 class ObjectEdit:
+    conditional_get = True
+
     def __init__(self, controller: FileController):
         self._controller = controller
 
@@ -525,3 +771,14 @@ class ObjectInfo:
     def on_get(self, _: falcon.Request, resp: falcon.Response, store_id: str, project_id: str, object_id: str):
         resp.media = self._controller.get_object_info(store_id=store_id, project_id=project_id, object_id=object_id) or {}
         resp.status = falcon.HTTP_200
+
+
+class ObjectsInfo:
+    def __init__(self, controller: FileController):
+        self._controller = controller
+
+    def on_get(self, req: falcon.Request, resp: falcon.Response, store_id: str, project_id: str):
+        # split manually, the csv parsing of the query string is not enabled by default
+        object_ids = [object_id for item in (req.get_param_as_list("ids") or []) for object_id in item.split(",") if object_id]
+        resp.media = self._controller.get_objects_info(store_id=store_id, project_id=project_id, object_ids=object_ids)
+        resp.status = falcon.HTTP_200
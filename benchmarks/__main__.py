@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+import falcon
+from falcon import testing
+
+from am.controller import FileController
+from am.middleware import RequireAuthGroups
+from am.routes import ProjectList, AssetList, AssetMetaEdit
+from common.consts import CONFIG_MEMORY_LATENCY, CONFIG_MEMORY_BANDWIDTH
+from common.entities import OveAssetMeta, OveProjectAccessMeta, UserAccessMeta
+
+_STORE = "bench"
+_GROUP = "bench"
+
+# path -> (request, maximum store calls with cold caches, maximum store calls with warm caches), given the number of projects and assets
+# the paths are checked as a user of the bench group, which can read one project out of two (projects // 2)
+_PATHS = {
+    "list_projects": (lambda projects, assets: "/api/{}/list".format(_STORE),
+                      lambda projects, assets: projects + 1, lambda projects, assets: 1),
+    "list_projects_metadata": (lambda projects, assets: "/api/{}/list?metadata=true".format(_STORE),
+                               lambda projects, assets: projects + projects // 2 + 1, lambda projects, assets: projects // 2 + 1),
+    "list_assets": (lambda projects, assets: "/api/{}/{}/list".format(_STORE, _project_id(1)),
+                    lambda projects, assets: 3, lambda projects, assets: 2),
+    "asset_meta": (lambda projects, assets: "/api/{}/{}/meta/{}".format(_STORE, _project_id(1), _asset_id(0)),
+                   lambda projects, assets: 2, lambda projects, assets: 0),
+}
+
+
+class _BenchUser:
+    """
+    Stands in for the AuthMiddleware, the token checks need the auth database and are not part of the benchmark.
+    """
+
+    def __init__(self, access: UserAccessMeta):
+        self._access = access
+
+    def process_request(self, req: falcon.Request, _resp: falcon.Response):
+        req.user_access = self._access
+
+
+def _project_id(index: int) -> str:
+    return "p{:04d}".format(index)
+
+
+def _asset_id(index: int) -> str:
+    return "a{:05d}".format(index)
+
+
+def _store_calls(controller: FileController) -> int:
+    return sum(counters["calls"] for stats in controller.pool_stats().values() for counters in stats.get("calls", {}).values())
+
+
+def _setup(args: argparse.Namespace, config_file: str) -> Tuple[FileController, testing.TestClient]:
+    with open(config_file, mode="w") as fout:
+        json.dump({"default": _STORE, "stores": [{"name": _STORE, "proxyUrl": "http://localhost:9000",
+                                                  CONFIG_MEMORY_LATENCY: args.latency, CONFIG_MEMORY_BANDWIDTH: args.bandwidth}]}, fout)
+
+    controller = FileController(store_type="memory", config_file=config_file)
+    for i in range(args.projects):
+        project_id = _project_id(i)
+        controller.create_project(store_id=_STORE, project_id=project_id)
+        controller.edit_project_access_meta(store_id=_STORE, project_id=project_id, meta=OveProjectAccessMeta(groups=[_GROUP] if i % 2 else ["other"]))
+    for i in range(args.assets):
+        controller.create_asset(store_id=_STORE, project_id=_project_id(1), meta=OveAssetMeta(id=_asset_id(i), name=_asset_id(i), project=_project_id(1)))
+    # the catalog is built by the first list, so the measures only depend on the caches
+    controller.list_assets(store_id=_STORE, project_id=_project_id(1))
+
+    access = UserAccessMeta(user="bench", read_groups=[_GROUP], write_groups=[], admin_access=False)
+    app = falcon.API(middleware=[_BenchUser(access=access), RequireAuthGroups(controller=controller)])
+    app.add_route('/api/{store_id}/list', ProjectList(controller=controller))
+    app.add_route('/api/{store_id}/{project_id}/list', AssetList(controller=controller))
+    app.add_route('/api/{store_id}/{project_id}/meta/{asset_id}', AssetMetaEdit(controller=controller))
+    return controller, testing.TestClient(app)
+
+
+# Returns the store calls and the average duration (in seconds) of the request
+def _measure(controller: FileController, client: testing.TestClient, path: str, repeat: int) -> Tuple[int, float]:
+    before = _store_calls(controller)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = client.simulate_get(path)
+        if result.status_code != 200:
+            raise RuntimeError("GET {} returned {}".format(path, result.status))
+    return (_store_calls(controller) - before) // repeat, (time.perf_counter() - start) / repeat
+
+
+def _run(args: argparse.Namespace, paths: List[str]) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        controller, client = _setup(args, config_file=os.path.join(tmp, "credentials.json"))
+
+        ok = True
+        print("{:<24} {:>6} {:>6} {:>10} {:>6} {:>6} {:>10}".format("path", "cold", "max", "cold (ms)", "warm", "max", "warm (ms)"))
+        for name in paths:
+            request, cold_budget, warm_budget = _PATHS[name]
+            path = request(args.projects, args.assets)
+
+            controller.reset_caches()
+            cold_calls, cold_duration = _measure(controller, client, path, repeat=1)
+            warm_calls, warm_duration = _measure(controller, client, path, repeat=args.repeat)
+
+            max_cold, max_warm = cold_budget(args.projects, args.assets), warm_budget(args.projects, args.assets)
+            ok = ok and cold_calls <= max_cold and warm_calls <= max_warm
+            print("{:<24} {:>6} {:>6} {:>10.1f} {:>6} {:>6} {:>10.1f}".format(name, cold_calls, max_cold, cold_duration * 1000,
+                                                                              warm_calls, max_warm, warm_duration * 1000))
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Store calls and latency of the AM read paths, against an in-memory store.")
+    parser.add_argument("paths", type=str, nargs="*", help="Paths to check (all by default): " + ", ".join(sorted(_PATHS.keys())))
+    parser.add_argument("--projects", type=int, default=20, help="Number of projects")
+    parser.add_argument("--assets", type=int, default=200, help="Number of assets of the listed project")
+    parser.add_argument("--latency", type=float, default=0.005, help="Latency added to every store call (seconds)")
+    parser.add_argument("--bandwidth", type=float, default=0, help="Store bandwidth (bytes per second, 0 is unlimited)")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of warm requests per path")
+
+    args = parser.parse_args()
+    if args.projects < 2:
+        parser.error("at least 2 projects are required")
+    unknown = [path for path in args.paths if path not in _PATHS]
+    if unknown:
+        parser.error("unknown paths: " + ", ".join(unknown))
+
+    if not _run(args, paths=args.paths or sorted(_PATHS.keys())):
+        print("[Error] Some paths made more store calls than expected")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
+import copy
+import functools
 import json
 import logging
+import multiprocessing
 import sys
-from typing import Dict, Union, List
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Union, List, Tuple
 
 import falcon
 import jwt
@@ -12,8 +19,10 @@ from pymongo.errors import CollectionInvalid
 
 from common.consts import CONFIG_MONGO, CONFIG_MONGO_HOST, CONFIG_MONGO_PORT, CONFIG_MONGO_USER, CONFIG_MONGO_PASSWORD, FIELD_AUTH_TOKEN
 from common.consts import CONFIG_MONGO_AUTH_COLLECTION, CONFIG_MONGO_DB, CONFIG_MONGO_MECHANISM
-from common.consts import DEFAULT_AUTH_CONFIG, CONFIG_AUTH_JWT, CONFIG_AUTH_JWT_SECRET
-from common.consts import HTTP_IGNORE_METHODS
+from common.consts import DEFAULT_AUTH_CONFIG, CONFIG_AUTH_JWT, CONFIG_AUTH_JWT_SECRET, CONFIG_AUTH_ARGON2, CONFIG_ARGON2_TIME_COST
+from common.consts import CONFIG_ARGON2_MEMORY_COST, CONFIG_ARGON2_PARALLELISM, CONFIG_ARGON2_WORKERS, CONFIG_ARGON2_MAX_PENDING
+from common.consts import HTTP_IGNORE_METHODS, CONFIG_CACHE, CONFIG_CACHE_TOKEN_TTL, CONFIG_CACHE_TOKEN_SIZE, CONFIG_CACHE_USER_TTL, CONFIG_CACHE_USER_SIZE
+from common.cache import TTLCache
 from common.entities import UserAccessMeta
 from common.util import to_bool, is_public
 
@@ -57,11 +66,101 @@ VALIDATION = {"$jsonSchema": {
 }}
 
 
+_DEFAULT_TOKEN_CACHE_SIZE = 4096
+_DEFAULT_TOKEN_CACHE_TTL = 300
+_DEFAULT_USER_CACHE_SIZE = 1024
+_DEFAULT_USER_CACHE_TTL = 30
+_DEFAULT_HASH_WORKERS = 2
+_DEFAULT_HASH_MAX_PENDING = 16
+# seconds the clients are asked to wait before trying again when too many logins are in progress
+_HASH_RETRY_AFTER = 1
+
+# config key -> passlib argon2 setting
+_ARGON2_SETTINGS = {CONFIG_ARGON2_TIME_COST: "time_cost", CONFIG_ARGON2_MEMORY_COST: "memory_cost", CONFIG_ARGON2_PARALLELISM: "parallelism"}
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies the passwords with argon2 on a bounded process pool, so the hashing does not hold the GIL of the API process.
+    At most `max_pending` passwords are queued or being processed, the other callers are rejected right away with a 503, so the logins
+    never hold more than `max_pending` API threads. With workers <= 0 the passwords are processed on the calling thread.
+    """
+
+    def __init__(self, settings: Dict = None, workers: int = _DEFAULT_HASH_WORKERS, max_pending: int = _DEFAULT_HASH_MAX_PENDING):
+        # hashable, so the configured handler can be cached by the pool processes
+        self.settings = tuple(sorted((settings or {}).items()))
+        self.workers = workers
+
+        self._slots = threading.BoundedSemaphore(max(max_pending, 1))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash_password, self.settings, password)
+
+    # returns whether the password matches and, if the hash was made with other cost parameters, the new hash of the password
+    def verify(self, password: str, hashed: str) -> Tuple[bool, Union[str, None]]:
+        return self._run(_verify_password, self.settings, password, hashed)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise falcon.HTTPServiceUnavailable(title="Too many logins in progress", description="Please try again in a few seconds",
+                                                retry_after=_HASH_RETRY_AFTER)
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        except BrokenProcessPool:
+            # a pool process died, the next call starts a new pool
+            self.close()
+            raise
+        finally:
+            self._slots.release()
+
+    # the pool is started on first use, after the service processes are forked
+    # the pool processes are not forked from the service process, which runs threads (gunicorn, pymongo, cache invalidations)
+    # whose locks would be inherited in whatever state they are in
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(start_method))
+            return self._executor
+
+
+@functools.lru_cache(maxsize=8)
+def _argon2_handler(settings: Tuple):
+    return argon2.using(**dict(settings)) if settings else argon2
+
+
+def _hash_password(settings: Tuple, password: str) -> str:
+    return _argon2_handler(settings).hash(password)
+
+
+def _verify_password(settings: Tuple, password: str, hashed: str) -> Tuple[bool, Union[str, None]]:
+    handler = _argon2_handler(settings)
+    if not handler.verify(password, hashed):
+        return False, None
+    return True, handler.hash(password) if handler.needs_update(hashed) else None
+
+
 class AuthManager:
     def __init__(self, config_file: str = DEFAULT_AUTH_CONFIG):
         self.jwt_secret = None
         self._client = None
         self._auth_collection = None
+        # token -> (expiration, access) of the verified tokens, the invalid tokens are never cached
+        self._token_cache = TTLCache(max_size=_DEFAULT_TOKEN_CACHE_SIZE, ttl=_DEFAULT_TOKEN_CACHE_TTL)
+        # user -> access, invalidated by the user edits made by this process
+        self._user_cache = TTLCache(max_size=_DEFAULT_USER_CACHE_SIZE, ttl=_DEFAULT_USER_CACHE_TTL)
+        self._hasher = PasswordHasher()
 
         self.load(config_file=config_file)
 
@@ -73,6 +172,17 @@ class AuthManager:
                 jwt_config = config.get(CONFIG_AUTH_JWT, {}) or {}
                 self.jwt_secret = jwt_config.get(CONFIG_AUTH_JWT_SECRET, None)
 
+                cache_config = config.get(CONFIG_CACHE, {}) or {}
+                self._token_cache = TTLCache(max_size=cache_config.get(CONFIG_CACHE_TOKEN_SIZE, _DEFAULT_TOKEN_CACHE_SIZE),
+                                             ttl=cache_config.get(CONFIG_CACHE_TOKEN_TTL, _DEFAULT_TOKEN_CACHE_TTL))
+                self._user_cache = TTLCache(max_size=cache_config.get(CONFIG_CACHE_USER_SIZE, _DEFAULT_USER_CACHE_SIZE),
+                                            ttl=cache_config.get(CONFIG_CACHE_USER_TTL, _DEFAULT_USER_CACHE_TTL))
+
+                argon2_config = config.get(CONFIG_AUTH_ARGON2, {}) or {}
+                self._hasher = PasswordHasher(settings={setting: argon2_config[key] for key, setting in _ARGON2_SETTINGS.items() if key in argon2_config},
+                                              workers=argon2_config.get(CONFIG_ARGON2_WORKERS, _DEFAULT_HASH_WORKERS),
+                                              max_pending=argon2_config.get(CONFIG_ARGON2_MAX_PENDING, _DEFAULT_HASH_MAX_PENDING))
+
                 mongo_config = config.get(CONFIG_MONGO, {}) or {}
                 self._client = MongoClient(host=mongo_config.get(CONFIG_MONGO_HOST),
                                            port=mongo_config.get(CONFIG_MONGO_PORT),
@@ -89,18 +199,27 @@ class AuthManager:
     def edit_user(self, access: UserAccessMeta, password: str = None, hashed: bool = False, add: bool = False) -> bool:
         db = access.to_db()
         if password:
-            db["password"] = password if hashed else argon2.hash(password)
+            db["password"] = password if hashed else self._hasher.hash(password)
 
-        if add:
-            self._auth_collection.insert_one(db)
-            return True
-        else:
-            result = self._auth_collection.update_one({"user": access.user}, {"$set": db})
-            return result.modified_count > 0
+        try:
+            if add:
+                self._auth_collection.insert_one(db)
+                return True
+            else:
+                result = self._auth_collection.update_one({"user": access.user}, {"$set": db})
+                return result.modified_count > 0
+        finally:
+            self._user_cache.invalidate(access.user)
 
     def remove_user(self, user: str) -> bool:
-        result = self._auth_collection.delete_many({"user": user})
-        return result.deleted_count > 0
+        try:
+            result = self._auth_collection.delete_many({"user": user})
+            return result.deleted_count > 0
+        finally:
+            self._user_cache.invalidate(user)
+
+    def cache_stats(self) -> Dict:
+        return {"token": self._token_cache.stats(), "user": self._user_cache.stats()}
 
     def get_groups(self) -> List[str]:
         try:
@@ -120,8 +239,14 @@ class AuthManager:
             return []
 
     def get_user(self, user: str) -> Union[UserAccessMeta, None]:
+        cached = self._user_cache.get(user, None)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
         try:
-            return self._from_db(self._auth_collection.find_one({"user": user}))
+            access = self._from_db(self._auth_collection.find_one({"user": user}))
+            self._user_cache.put(user, access)
+            return copy.deepcopy(access)
         except:
             logging.error("Get user(%s) Error: %s", user, sys.exc_info()[1])
             return None
@@ -129,7 +254,19 @@ class AuthManager:
     def auth_user(self, user: str, password: str) -> Union[UserAccessMeta, None]:
         try:
             auth = self._auth_collection.find_one({"user": user})
-            return self._from_db(auth) if argon2.verify(password, auth.get("password", None)) else None
+            valid, new_hash = self._hasher.verify(password, auth.get("password", None))
+            if not valid:
+                return None
+
+            if new_hash:
+                # the argon2 cost parameters changed since the password was hashed
+                try:
+                    self._auth_collection.update_one({"user": user}, {"$set": {"password": new_hash}})
+                except:
+                    logging.error("Error while trying to rehash the password of %s. Error: %s", user, sys.exc_info()[1])
+            return self._from_db(auth)
+        except falcon.HTTPError:
+            raise
         except:
             logging.error("Auth Error: %s", sys.exc_info()[1])
             return None
@@ -142,9 +279,18 @@ class AuthManager:
         if not token:
             return None
 
+        cached = self._token_cache.get(token, None)
+        if cached is not None:
+            expiration, access = cached
+            if expiration is None or expiration > time.time():
+                return access
+            self._token_cache.invalidate(token)
+
         try:
             payload = jwt.decode(jwt=token.encode("utf-8"), key=self.jwt_secret, verify=True)
-            return self._from_public(payload)
+            access = self._from_public(payload)
+            self._token_cache.put(token, (payload.get("exp", None), access))
+            return access
         except:
             logging.error("Decode Error: %s", sys.exc_info()[1])
             return None
@@ -159,6 +305,7 @@ class AuthManager:
             return db[collection_name]
 
     def close(self):
+        self._hasher.close()
         if self._client:
             self._client.close()
 
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# number of invalidation counters, the keys sharing a counter only skip a few more fills
+_GENERATION_SLOTS = 1024
+
+
+class TTLCache:
+    """
+    Thread-safe, bounded LRU cache where every entry expires after a fixed time-to-live.
+    A cache configured with max_size <= 0 or ttl <= 0 is disabled and never stores anything.
+    Read-through fills should pass the `generation` of the key taken before reading the value, so a value read before a concurrent
+    invalidation of the key is not put back in the cache.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped by the invalidations, per key (hashed into slots) and for the whole cache
+        self._generations = [0] * _GENERATION_SLOTS
+        self._epoch = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+
+        with self._lock:
+            entry = self._data.get(key, None)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+            self.misses += 1
+            return default
+
+    def generation(self, key: Hashable) -> Tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._generations[_slot(key)]
+
+    def put(self, key: Hashable, value: Any, generation: Tuple[int, int] = None) -> None:
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations[_slot(key)]):
+                # the key was invalidated while the value was read, so the value may be stale
+                return
+
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._generations[_slot(key)] += 1
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        with self._lock:
+            self._epoch += 1
+            for key in [k for k in self._data.keys() if predicate(k)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"size": len(self._data), "maxSize": self.max_size, "ttl": self.ttl, "hits": self.hits, "misses": self.misses,
+                    "hitRatio": self.hits / total if total > 0 else 0.0}
+
+
+def _slot(key: Hashable) -> int:
+    return hash(key) % _GENERATION_SLOTS
@@ -9,9 +9,50 @@ CONFIG_ENDPOINT = "endpoint"
 CONFIG_ACCESS_KEY = "accessKey"
 CONFIG_SECRET_KEY = "secretKey"
 CONFIG_PROXY_URL = "proxyUrl"
+CONFIG_STORE_PATH = "path"
+CONFIG_LIST_WORKERS = "listWorkers"
+CONFIG_BATCH_WORKERS = "batchWorkers"
+CONFIG_PART_SIZE = "partSize"
+CONFIG_UPLOAD_WORKERS = "uploadWorkers"
+CONFIG_PART_RETRIES = "partRetries"
+CONFIG_DOWNLOAD_WORKERS = "downloadWorkers"
+CONFIG_DOWNLOAD_THRESHOLD = "rangedDownloadThreshold"
+CONFIG_FOLDER_UPLOAD_WORKERS = "folderUploadWorkers"
+CONFIG_HTTP_CLIENT = "httpClient"
+CONFIG_HTTP_POOL_SIZE = "maxPoolSize"
+CONFIG_HTTP_CONNECT_TIMEOUT = "connectTimeout"
+CONFIG_HTTP_READ_TIMEOUT = "readTimeout"
+CONFIG_HTTP_RETRIES = "retries"
+CONFIG_HTTP_BACKOFF = "backoff"
+CONFIG_MEMORY_LATENCY = "latency"
+CONFIG_MEMORY_BANDWIDTH = "bandwidth"
+
+CONFIG_CACHE = "cache"
+CONFIG_CACHE_ACL_TTL = "aclTtl"
+CONFIG_CACHE_ACL_SIZE = "aclSize"
+CONFIG_CACHE_META_TTL = "metaTtl"
+CONFIG_CACHE_META_SIZE = "metaSize"
+CONFIG_CACHE_TOKEN_TTL = "tokenTtl"
+CONFIG_CACHE_TOKEN_SIZE = "tokenSize"
+CONFIG_CACHE_USER_TTL = "userTtl"
+CONFIG_CACHE_USER_SIZE = "userSize"
+CONFIG_STORE_CALLS = "storeCalls"
+CONFIG_STORE_CALLS_LOG = "log"
+CONFIG_STORE_CALLS_HEADER = "header"
+CONFIG_PROFILING = "profiling"
+CONFIG_PROFILING_SAMPLE_RATE = "sampleRate"
+CONFIG_PROFILING_THRESHOLD = "threshold"
+CONFIG_PROFILING_TOP = "top"
+CONFIG_PROFILING_KEEP = "keep"
 
 CONFIG_AUTH_JWT = "jwt"
 CONFIG_AUTH_JWT_SECRET = "secret"
+CONFIG_AUTH_ARGON2 = "argon2"
+CONFIG_ARGON2_TIME_COST = "timeCost"
+CONFIG_ARGON2_MEMORY_COST = "memoryCost"
+CONFIG_ARGON2_PARALLELISM = "parallelism"
+CONFIG_ARGON2_WORKERS = "workers"
+CONFIG_ARGON2_MAX_PENDING = "maxPending"
 
 CONFIG_MONGO = "mongo"
 CONFIG_MONGO_HOST = "host"
@@ -23,10 +64,15 @@ CONFIG_MONGO_MECHANISM = "mechanism"
 CONFIG_MONGO_AUTH_COLLECTION = "collection"
 CONFIG_MONGO_WORKER_COLLECTION = "workerCollection"
 CONFIG_MONGO_QUEUE_COLLECTION = "workerQueue"
+CONFIG_MONGO_INVALIDATION_COLLECTION = "invalidationCollection"
+
+DEFAULT_INVALIDATION_COLLECTION = "cacheInvalidations"
 
 FIELD_AUTH_TOKEN = "AUTH_TOKEN"
 
 OVE_META = ".ovemeta"
+OVE_CATALOG = ".ovecatalog"
+OVE_UPDATED = ".oveupdated"
 PROJECT_FILE = "project.json"
 
 PROJECT_METADATA_SECTION = "Metadata"
@@ -38,6 +84,7 @@ S3_SEPARATOR = "/"
 S3_OBJECT_EXTENSION = ".json"
 
 MAX_LIST_ITEMS = 1000
+MAX_BATCH_OPERATIONS = 1000
 
 HTTP_IGNORE_METHODS = {'CONNECT', 'HEAD', 'OPTIONS', 'TRACE'}
 HTTP_READ_METHODS = {'GET'}
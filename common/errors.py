@@ -5,20 +5,24 @@ import falcon
 
 def handle_exceptions(ex: Exception, _req: falcon.Request, _resp: falcon.Response, _params):
     logging.debug("Handling exception: %s", repr(ex))
+    raise to_http_error(ex)
 
+
+# The HTTP error returned to the clients for an exception
+def to_http_error(ex: Exception) -> falcon.HTTPError:
     if isinstance(ex, falcon.HTTPError):
-        raise ex
+        return ex
 
     if isinstance(ex, StreamNotFoundError):
-        raise falcon.HTTPNotFound()
+        return falcon.HTTPNotFound()
 
     if isinstance(ex, (AssetExistsError, ObjectExistsError)):
-        raise falcon.HTTPConflict(title=ex.title, description=ex.description)
+        return falcon.HTTPConflict(title=ex.title, description=ex.description)
 
     if isinstance(ex, ValidationError):
-        raise falcon.HTTPBadRequest(title=ex.title, description=ex.description)
+        return falcon.HTTPBadRequest(title=ex.title, description=ex.description)
 
-    raise falcon.HTTPBadRequest(title="Internal Server error", description=str(ex))
+    return falcon.HTTPBadRequest(title="Internal Server error", description=str(ex))
 
 
 class ValidationError(Exception):
@@ -33,6 +33,14 @@ def save_filename(save_fn: Callable, req: falcon.Request):
         save_fn(upload_filename=cache.name)
 
 
+# Streams the request body to the save function, falling back to a temp file if the body size is unknown
+def save_stream(save_fn: Callable, save_file_fn: Callable, req: falcon.Request):
+    if req.content_length is None:
+        save_filename(save_file_fn, req)
+    else:
+        save_fn(stream=req.bounded_stream, length=req.content_length)
+
+
 def auth_token(req: falcon.Request) -> Union[str, None]:
     tokens = req.get_cookie_values(FIELD_AUTH_TOKEN)
     return tokens[0] if tokens else None
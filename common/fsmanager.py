@@ -0,0 +1,545 @@
+# Store backend for shared (NFS) or local disks, exposing the same interface as the S3Manager
+# Projects are directories under the store path and the objects keep the same layout as on the object store,
+# so a store can be moved between the two backends by copying the files
+import copy
+import datetime
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Union, Dict, Callable, List, Any, Tuple, Set, Iterator, Iterable
+
+from common.consts import CONFIG_STORE_DEFAULT, CONFIG_STORE_NAME, CONFIG_STORES, CONFIG_STORE_PATH, CONFIG_PROXY_URL, CONFIG_FOLDER_UPLOAD_WORKERS
+from common.consts import CONFIG_BATCH_WORKERS
+from common.consts import DEFAULT_CREDENTIALS_CONFIG, S3_SEPARATOR, OVE_META, PROJECT_FILE, S3_OBJECT_EXTENSION, MAX_LIST_ITEMS
+from common.consts import PROJECT_BASIC_TEMPLATE, PROJECT_METADATA_SECTION, CONFIG_PROFILING
+from common.entities import OveAssetMeta, OveProjectMeta, OveProjectAccessMeta, UserAccessMeta
+from common.errors import ValidationError, InvalidStoreError, InvalidAssetError, InvalidObjectError, StreamNotFoundError, InvalidProjectError
+from common.filters import DEFAULT_FILTER
+from common.metrics import Histogram
+from common.store_util import ProjectDescriptor, format_date, project_meta, has_group_access, get_project_type, encode_cursor, decode_cursor
+from common.store_util import validate_object_id
+from common.util import append_slash
+
+_DEFAULT_LABEL = "*"
+_DEFAULT_OBJECT_ENCODING = "utf-8"
+_DEFAULT_FOLDER_UPLOAD_WORKERS = 8
+_DEFAULT_BATCH_WORKERS = 8
+_COPY_BUFFER_SIZE = 1024 * 1024
+# prefix of the files being written, they are renamed once complete
+_TEMP_PREFIX = ".ovetmp-"
+
+
+class FSManager:
+    def __init__(self):
+        self._store_config = {}
+        self._profiling_config = {}
+
+    def load(self, config_file: str = DEFAULT_CREDENTIALS_CONFIG):
+        try:
+            with open(config_file, mode="r") as fin:
+                config = json.load(fin)
+                default_store = config.get(CONFIG_STORE_DEFAULT, None)
+
+                self._profiling_config = config.get(CONFIG_PROFILING, {}) or {}
+
+                for store_config in config.get(CONFIG_STORES, []):
+                    store_id = store_config.get(CONFIG_STORE_NAME, "")
+                    self._store_config[store_id] = store_config
+                    if default_store == store_id:
+                        self._store_config[_DEFAULT_LABEL] = store_config
+                logging.info("Loaded %s store configs from the config file", len(self._store_config))
+        except:
+            logging.error("Error while trying to load store config. Error: %s", sys.exc_info()[1])
+
+    def setup(self, store_config: Dict):
+        self._store_config[_DEFAULT_LABEL] = store_config
+
+    def clear(self):
+        self._store_config.clear()
+
+    # the files are read straight from the disk, so there is nothing to cache or to invalidate
+    def set_invalidation_publisher(self, publisher: Callable[[str, str, str], None]) -> None:
+        pass
+
+    def apply_invalidation(self, store: str, project_id: str, key: str) -> None:
+        pass
+
+    def reset_caches(self) -> None:
+        pass
+
+    def cache_stats(self) -> Dict:
+        return {}
+
+    def pool_stats(self) -> Dict:
+        return {}
+
+    def store_call_stats(self) -> Dict:
+        return {}
+
+    def store_call_latency(self) -> Histogram:
+        return Histogram()
+
+    def store_calls_config(self) -> Dict:
+        return {}
+
+    def profiling_config(self) -> Dict:
+        return self._profiling_config
+
+    def get_store_config(self, store_id: str = None) -> Dict:
+        store_id = store_id if store_id else _DEFAULT_LABEL
+        return self._store_config.get(store_id, None)
+
+    def _get_root(self, store_id: str = None) -> str:
+        store_config = self.get_store_config(store_id)
+        if store_config is None or not store_config.get(CONFIG_STORE_PATH, None):
+            raise InvalidStoreError(store_id)
+        return os.path.abspath(store_config.get(CONFIG_STORE_PATH))
+
+    def _get_proxy_url(self, store_id: str = None) -> str:
+        store_config = self.get_store_config(store_id)
+        return store_config.get(CONFIG_PROXY_URL, "") if store_config is not None else ""
+
+    # Maps a project and a key to a path on the disk, refusing the projects escaping the store folder and the keys escaping the project
+    def _path(self, store_id: str, project_id: str, key: str = None) -> str:
+        root = self._get_root(store_id)
+        project_root = os.path.normpath(os.path.join(root, project_id or ""))
+        if not project_id or S3_SEPARATOR in project_id or os.path.dirname(project_root) != root:
+            raise ValidationError(title="Invalid path", description="The path provided is outside the store")
+        if not key:
+            return project_root
+
+        path = os.path.normpath(os.path.join(project_root, *key.split(S3_SEPARATOR)))
+        if not path.startswith(project_root + os.sep):
+            raise ValidationError(title="Invalid path", description="The path provided is outside the project")
+        return path
+
+    # Apply fn on the items of a batch request, preserving the order of the results
+    def map_batch(self, fn: Callable, items: Iterable, store_id: str = None) -> List:
+        max_workers = (self.get_store_config(store_id) or {}).get(CONFIG_BATCH_WORKERS, _DEFAULT_BATCH_WORKERS)
+        if not max_workers or max_workers <= 1:
+            return [fn(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fs-batch") as executor:
+            return list(executor.map(fn, items))
+
+    def list_stores(self) -> List[str]:
+        return [store for store in self._store_config.keys() if store != _DEFAULT_LABEL]
+
+    def list_projects(self, access: UserAccessMeta, store_id: str = None, metadata: bool = False, result_filter: Callable = None) -> List[Dict]:
+        def _project_item(entry: os.DirEntry) -> Union[None, Dict]:
+            try:
+                descriptor = self._load_project_descriptor(store_id=store_id, project_id=entry.name)
+                if not (result_filter(descriptor.meta) and descriptor.has_access(groups=access.read_groups, is_admin=access.admin_access)):
+                    return None
+
+                item = descriptor.to_public_json(access=access)
+                item["creationDate"] = format_date(_timestamp(entry.stat().st_ctime))
+                item["updateDate"] = self._last_modified(store_id=store_id, project_id=entry.name)
+                return item
+            except:
+                logging.error("Error while trying to list project '%s'. Error: %s", entry.name, sys.exc_info()[1])
+                return None
+
+        try:
+            projects = sorted([entry for entry in os.scandir(self._get_root(store_id)) if entry.is_dir()], key=lambda e: e.name)
+            if metadata:
+                result_filter = result_filter if result_filter is not None else DEFAULT_FILTER
+                return [item for item in (_project_item(entry) for entry in projects) if item is not None]
+            else:
+                return [{
+                    "id": entry.name,
+                    "creationDate": format_date(_timestamp(entry.stat().st_ctime)),
+                } for entry in projects if self.has_access(store_id=store_id, project_id=entry.name, groups=access.read_groups, is_admin=access.admin_access)]
+        except InvalidStoreError:
+            raise
+        except:
+            logging.error("Error while trying to list store. Error: %s", sys.exc_info()[1])
+            return []
+
+    def _last_modified(self, project_id: str, store_id: str = None) -> str:
+        ts = [entry.stat().st_mtime for entry in os.scandir(self._path(store_id, project_id))]
+        return format_date(_timestamp(max(ts))) if len(ts) > 0 else ''
+
+    def list_assets(self, project_id: str, store_id: str = None, result_filter: Callable = None, refresh: bool = False) -> List[Dict]:
+        def _format(name: str, meta: OveAssetMeta) -> Union[str, Dict]:
+            return meta.to_public_json() if meta else {"name": name, "project": project_id}
+
+        # reading the metadata from the disk is cheap, so there is no catalog and refresh is ignored
+        result_filter = result_filter if result_filter is not None else DEFAULT_FILTER
+        try:
+            folders = sorted([entry.name for entry in os.scandir(self._path(store_id, project_id)) if entry.is_dir()])
+            metas = {asset_id: self.get_asset_meta(project_id, asset_id, store_id, ignore_errors=True) for asset_id in folders}
+            if not result_filter(None):
+                metas = {asset_id: meta for asset_id, meta in metas.items() if meta is not None}
+
+            return [_format(name, metas[name]) for name in sorted(metas.keys()) if result_filter(metas[name])]
+        except:
+            logging.error("Error while trying to list assets. Error: %s", sys.exc_info()[1])
+            return []
+
+    def list_files(self, project_id: str, asset_id: str, store_id: str = None, version: str = None) -> List[Dict]:
+        try:
+            return self.list_files_page(store_id=store_id, project_id=project_id, asset_id=asset_id, version=version)["items"]
+        except:
+            logging.error("Error while trying to list assets. Error: %s", sys.exc_info()[1])
+            return []
+
+    # The files are listed in the same (lexicographic) order as on the object store, so the cursors have the same meaning
+    def list_files_page(self, project_id: str, asset_id: str, store_id: str = None, version: str = None, limit: int = MAX_LIST_ITEMS,
+                        cursor: str = None) -> Dict:
+        meta = self.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id)
+        version = version or str(meta.version)
+        prefix = asset_id + "/" + version + "/"
+        start_after = decode_cursor(cursor, prefix=prefix) if cursor else ""
+        limit = max(1, min(limit or MAX_LIST_ITEMS, MAX_LIST_ITEMS))
+
+        result = []
+        last_name = None
+        has_more = False
+        for object_name in _walk(self._path(store_id, project_id, prefix), prefix=prefix, start_after=start_after):
+            if len(result) >= limit:
+                has_more = True
+                break
+
+            result.append({
+                "name": object_name[len(prefix):],
+                "url": meta.proxy_url + project_id + "/" + object_name,
+                "default": meta.filename == object_name[len(prefix):]
+            })
+            last_name = object_name
+
+        return {"items": result, "nextCursor": encode_cursor(last_name) if has_more else None}
+
+    def check_exists(self, project_id: str, store_id: str = None) -> bool:
+        return os.path.isdir(self._path(store_id, project_id))
+
+    def create_project(self, project_id: str, store_id: str = None) -> None:
+        try:
+            os.mkdir(self._path(store_id, project_id))
+        except OSError:
+            logging.error("Error while trying to create project. Error: %s", sys.exc_info()[1])
+            raise ValidationError("Unable to create project on remote storage. Please check the project name.")
+
+    def create_asset(self, project_id: str, meta: OveAssetMeta, store_id: str = None) -> OveAssetMeta:
+        meta.proxy_url = self._get_proxy_url(store_id)
+        try:
+            self._write_json(store_id=store_id, project_id=project_id, key=meta.id + S3_SEPARATOR + OVE_META, data=meta.to_json())
+            meta.created()
+            self.set_asset_meta(store_id=store_id, project_id=project_id, asset_id=meta.id, meta=meta)
+            return meta
+        except OSError:
+            logging.error("Error while trying to create asset. Error: %s", sys.exc_info()[1])
+            raise ValidationError("Unable to create asset on remote storage. Please check the asset name.")
+
+    def upload_asset(self, project_id: str, asset_id: str, filename: str, upload_filename: str, store_id: str = None) -> None:
+        try:
+            self._upload_file(store_id=store_id, project_id=project_id, asset_id=asset_id, filename=filename, upload_filename=upload_filename)
+        except Exception:
+            logging.error("Error while trying to upload. Error: %s", sys.exc_info()[1])
+            raise ValidationError("Unable to upload asset to remote storage.")
+
+    def _upload_file(self, project_id: str, asset_id: str, filename: str, upload_filename: str, store_id: str = None) -> None:
+        path = self._path(store_id, project_id, asset_id + S3_SEPARATOR + filename)
+        with open(upload_filename, mode="rb") as fin:
+            _write_atomic(path, lambda fout: _copy_file(fin, fout))
+
+    def upload_asset_stream(self, project_id: str, asset_id: str, filename: str, stream: io.RawIOBase, length: int, store_id: str = None) -> None:
+        try:
+            path = self._path(store_id, project_id, asset_id + S3_SEPARATOR + filename)
+            _write_atomic(path, lambda fout: _copy_stream(stream, fout, length))
+        except Exception:
+            logging.error("Error while trying to upload. Error: %s", sys.exc_info()[1])
+            raise ValidationError("Unable to upload asset to remote storage.")
+
+    def upload_assets(self, project_id: str, asset_id: str, uploads: List[Tuple[str, str]], store_id: str = None,
+                      progress: Callable[[int, int], None] = None) -> Dict[str, str]:
+        store_config = self.get_store_config(store_id) or {}
+        max_workers = store_config.get(CONFIG_FOLDER_UPLOAD_WORKERS, _DEFAULT_FOLDER_UPLOAD_WORKERS) or 1
+
+        failures = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fs-folder") as executor:
+            futures = {executor.submit(self._upload_file, store_id=store_id, project_id=project_id, asset_id=asset_id, filename=filename,
+                                       upload_filename=upload_filename): filename for filename, upload_filename in uploads}
+            for count, future in enumerate(as_completed(futures), start=1):
+                if future.exception() is not None:
+                    failures[futures[future]] = str(future.exception())
+                if progress:
+                    progress(count, len(futures))
+        return failures
+
+    def download_asset(self, project_id: str, asset_id: str, filename: str, down_filename: str, store_id: str = None) -> None:
+        try:
+            with open(self._path(store_id, project_id, asset_id + S3_SEPARATOR + filename), mode="rb") as fin:
+                with open(down_filename, mode="wb") as fout:
+                    _copy_file(fin, fout)
+        except Exception:
+            logging.error("Error while trying to download. Error: %s", sys.exc_info()[1])
+            raise ValidationError("Unable to download asset from remote storage.")
+
+    def _read_json(self, project_id: str, key: str, store_id: str = None) -> Union[None, Dict]:
+        try:
+            with open(self._path(store_id, project_id, key), mode="r", encoding=_DEFAULT_OBJECT_ENCODING) as fin:
+                return json.load(fin)
+        except FileNotFoundError:
+            return None
+
+    # Readers either see the previous or the new version of the file, never a partial one
+    def _write_json(self, project_id: str, key: str, data: Any, store_id: str = None) -> None:
+        encoded = json.dumps(data).encode(encoding=_DEFAULT_OBJECT_ENCODING)
+        _write_atomic(self._path(store_id, project_id, key), lambda fout: fout.write(encoded))
+
+    def has_project_meta(self, project_id: str, store_id: str = None) -> bool:
+        return os.path.isfile(self._path(store_id, project_id, OVE_META))
+
+    # the files are read straight from the disk, so every read is fresh and use_cache is ignored
+    def get_project_meta(self, project_id: str, store_id: str = None, ignore_errors: bool = False, use_cache: bool = True) -> Union[None, OveProjectMeta]:
+        try:
+            project = self._read_json(store_id=store_id, project_id=project_id, key=PROJECT_FILE)
+            if project is None:
+                raise InvalidProjectError(store_id=store_id, project_id=project_id)
+            return project_meta(project_id=project_id, metadata=project[PROJECT_METADATA_SECTION], proxy_url=self._get_proxy_url(store_id))
+        except:
+            if ignore_errors:
+                return OveProjectMeta(id=project_id, name=project_id)
+            else:
+                logging.error("Error while trying to get project meta. Error: %s", sys.exc_info()[1])
+                raise InvalidProjectError(store_id=store_id, project_id=project_id)
+
+    def set_project_meta(self, project_id: str, meta: OveProjectMeta, store_id: str = None, ignore_errors: bool = False) -> None:
+        try:
+            project = self._read_json(store_id=store_id, project_id=project_id, key=PROJECT_FILE)
+            if project is None:
+                project = copy.deepcopy(PROJECT_BASIC_TEMPLATE)
+
+            if PROJECT_METADATA_SECTION not in project.keys():
+                project[PROJECT_METADATA_SECTION] = {}
+
+            for field in OveProjectMeta.EDITABLE_FIELDS:
+                project[PROJECT_METADATA_SECTION][field] = getattr(meta, field, '')
+
+            self._write_json(store_id=store_id, project_id=project_id, key=PROJECT_FILE, data=project)
+        except:
+            if not ignore_errors:
+                logging.error("Error while trying to set project meta. Error: %s", sys.exc_info()[1])
+                raise InvalidProjectError(store_id=store_id, project_id=project_id)
+
+    def get_project_access_meta(self, store_id: str, project_id: str) -> Union[None, OveProjectAccessMeta]:
+        try:
+            params = self._read_json(store_id=store_id, project_id=project_id, key=OVE_META)
+            return OveProjectAccessMeta(**params) if params is not None else OveProjectAccessMeta()
+        except:
+            return OveProjectAccessMeta()
+
+    def set_project_access_meta(self, store_id: str, project_id: str, meta: OveProjectAccessMeta) -> None:
+        try:
+            self._write_json(store_id=store_id, project_id=project_id, key=OVE_META, data=meta.to_json())
+        except:
+            logging.error("Error while trying to set project meta. Error: %s", sys.exc_info()[1])
+
+    def has_access(self, store_id: str, project_id: str, groups: List[str], is_admin: bool) -> bool:
+        if is_admin:
+            return True
+
+        if groups is None or len(groups) == 0:
+            return False
+
+        meta = self.get_project_access_meta(store_id=store_id, project_id=project_id)
+        return has_group_access(project_groups=meta.groups, groups=groups, is_admin=is_admin)
+
+    def has_asset_meta(self, project_id: str, asset_id: str, store_id: str = None) -> bool:
+        return os.path.isfile(self._path(store_id, project_id, asset_id + S3_SEPARATOR + OVE_META))
+
+    def get_asset_meta(self, project_id: str, asset_id: str, store_id: str = None, ignore_errors: bool = False,
+                       use_cache: bool = True) -> Union[None, OveAssetMeta]:
+        try:
+            obj = self._read_json(store_id=store_id, project_id=project_id, key=asset_id + S3_SEPARATOR + OVE_META)
+            if obj is None:
+                raise InvalidAssetError(store_id=store_id, project_id=project_id, asset_id=asset_id)
+            meta = OveAssetMeta(**obj)
+            meta.id = asset_id
+            return meta
+        except:
+            if ignore_errors:
+                return None
+            else:
+                logging.error("Error while trying to get asset meta. Error: %s", sys.exc_info()[1])
+                raise InvalidAssetError(store_id=store_id, project_id=project_id, asset_id=asset_id)
+
+    def set_asset_meta(self, project_id: str, asset_id: str, meta: OveAssetMeta, store_id: str = None, ignore_errors: bool = False) -> None:
+        try:
+            self._write_json(store_id=store_id, project_id=project_id, key=asset_id + S3_SEPARATOR + OVE_META, data=meta.to_json())
+        except:
+            if not ignore_errors:
+                logging.error("Error while trying to set asset meta. Error: %s", sys.exc_info()[1])
+                raise InvalidAssetError(store_id=store_id, project_id=project_id, asset_id=asset_id)
+
+    # Returns the errors of the assets that could not be saved
+    def set_asset_metas(self, project_id: str, metas: Dict[str, OveAssetMeta], store_id: str = None) -> Dict[str, Exception]:
+        errors = {}
+        for asset_id, meta in metas.items():
+            try:
+                self.set_asset_meta(project_id=project_id, asset_id=asset_id, meta=meta, store_id=store_id)
+            except InvalidAssetError as ex:
+                errors[asset_id] = ex
+        return errors
+
+    def project_type(self, store_id: str, project_id: str) -> str:
+        return get_project_type(self.get_object(store_id=store_id, project_id=project_id, object_id="project", ignore_errors=True))
+
+    def _load_project_descriptor(self, project_id: str, store_id: str = None) -> ProjectDescriptor:
+        project = self.get_object(store_id=store_id, project_id=project_id, object_id="project", ignore_errors=True)
+        access_meta = self.get_project_access_meta(store_id=store_id, project_id=project_id)
+        return ProjectDescriptor(project_id=project_id, project=project, access_meta=access_meta, proxy_url=self._get_proxy_url(store_id))
+
+    def describe_project(self, project_id: str, access: UserAccessMeta, store_id: str = None) -> Dict:
+        return self._load_project_descriptor(store_id=store_id, project_id=project_id).to_public_json(access=access)
+
+    def has_object(self, project_id: str, object_id: str, store_id: str = None) -> bool:
+        validate_object_id(store_id=store_id, project_id=project_id, object_id=object_id)
+        return os.path.isfile(self._path(store_id, project_id, object_id + S3_OBJECT_EXTENSION))
+
+    def exists_many(self, project_id: str, keys: List[str], store_id: str = None) -> Set[str]:
+        return {key for key in keys if os.path.isfile(self._path(store_id, project_id, key))}
+
+    def has_objects(self, project_id: str, object_ids: List[str], store_id: str = None) -> List[str]:
+        for object_id in object_ids:
+            validate_object_id(store_id=store_id, project_id=project_id, object_id=object_id)
+
+        existing = self.exists_many(store_id=store_id, project_id=project_id, keys=[object_id + S3_OBJECT_EXTENSION for object_id in object_ids])
+        return [object_id for object_id in object_ids if object_id + S3_OBJECT_EXTENSION in existing]
+
+    def get_object(self, project_id: str, object_id: str, store_id: str = None, ignore_errors: bool = False) -> Union[None, Dict]:
+        validate_object_id(store_id=store_id, project_id=project_id, object_id=object_id)
+
+        try:
+            data = self._read_json(store_id=store_id, project_id=project_id, key=object_id + S3_OBJECT_EXTENSION)
+            if data is None:
+                raise InvalidObjectError(store_id=store_id, project_id=project_id, object_id=object_id)
+            return data
+        except Exception:
+            if ignore_errors:
+                return None
+            else:
+                logging.error("Error while trying to get object. Error: %s", sys.exc_info()[1])
+                raise InvalidObjectError(store_id=store_id, project_id=project_id, object_id=object_id)
+
+    def get_object_info(self, project_id: str, object_id: str, store_id: str = None) -> Union[None, Dict]:
+        if self.has_object(store_id=store_id, project_id=project_id, object_id=object_id):
+            return self._object_info(project_id=project_id, object_id=object_id, store_id=store_id)
+        else:
+            return None
+
+    def get_objects_info(self, project_id: str, object_ids: List[str], store_id: str = None) -> List[Dict]:
+        return [self._object_info(project_id=project_id, object_id=object_id, store_id=store_id)
+                for object_id in self.has_objects(store_id=store_id, project_id=project_id, object_ids=object_ids)]
+
+    def _object_info(self, project_id: str, object_id: str, store_id: str = None) -> Dict:
+        return {
+            "name": object_id,
+            "index_file": append_slash(self._get_proxy_url(store_id=store_id)) + project_id + "/" + object_id + S3_OBJECT_EXTENSION
+        }
+
+    def set_object(self, project_id: str, object_id: str, object_data: Dict, store_id: str = None) -> None:
+        validate_object_id(store_id=store_id, project_id=project_id, object_id=object_id)
+
+        try:
+            self._write_json(store_id=store_id, project_id=project_id, key=object_id + S3_OBJECT_EXTENSION, data=object_data)
+        except Exception:
+            logging.error("Error while trying to set object. Error: %s", sys.exc_info()[1])
+            raise InvalidObjectError(store_id=store_id, project_id=project_id, object_id=object_id)
+
+    def get_stream(self, store_id: str, project_id: str, path_name: str) -> io.FileIO:
+        try:
+            return open(self._path(store_id, project_id, path_name), mode="rb")
+        except Exception:
+            logging.error("Error while trying to get stream. Error: %s", sys.exc_info()[1])
+            raise StreamNotFoundError(store_id=store_id, project_id=project_id, filename=path_name)
+
+    def get_stream_meta(self, store_id: str, project_id: str, path_name: str) -> Dict:
+        try:
+            stat = os.stat(self._path(store_id, project_id, path_name))
+            return {"size": stat.st_size, "last_modified": _timestamp(stat.st_mtime)}
+        except Exception:
+            logging.error("Error while trying to get stream metadata. Error: %s", sys.exc_info()[1])
+            raise StreamNotFoundError(store_id=store_id, project_id=project_id, filename=path_name)
+
+
+# Helpers
+def _timestamp(ts: float) -> datetime.datetime:
+    return datetime.datetime.utcfromtimestamp(ts)
+
+
+def _walk(path: str, prefix: str, start_after: str = "") -> Iterator[str]:
+    # sorting the folders as "name/" gives the lexicographic order of the full keys, like the object store listings
+    try:
+        entries = sorted(os.scandir(path), key=lambda e: e.name + S3_SEPARATOR if e.is_dir() else e.name)
+    except FileNotFoundError:
+        return
+
+    for entry in entries:
+        key = prefix + entry.name
+        if entry.is_dir():
+            folder = key + S3_SEPARATOR
+            # skip the folders listed entirely by the previous pages
+            if folder < start_after and not start_after.startswith(folder):
+                continue
+            yield from _walk(entry.path, prefix=folder, start_after=start_after)
+        elif key > start_after and not entry.name.startswith(_TEMP_PREFIX):
+            yield key
+
+
+def _write_atomic(path: str, write_fn: Callable[[io.BufferedWriter], Any]) -> None:
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=_TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, mode="wb") as fout:
+            write_fn(fout)
+            fout.flush()
+            os.fsync(fout.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _copy_file(fin: io.BufferedReader, fout: io.BufferedWriter) -> None:
+    # the data is copied by the kernel when possible, without going through user space
+    if hasattr(os, "sendfile"):
+        fout.flush()
+        offset = 0
+        size = os.fstat(fin.fileno()).st_size
+        try:
+            while offset < size:
+                sent = os.sendfile(fout.fileno(), fin.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            if offset == size:
+                return
+        except OSError:
+            # some file systems do not support sendfile between files
+            if offset > 0:
+                raise
+        fin.seek(offset)
+    shutil.copyfileobj(fin, fout, _COPY_BUFFER_SIZE)
+
+
+def _copy_stream(stream: Any, fout: io.BufferedWriter, length: int) -> None:
+    remaining = length
+    while remaining > 0:
+        chunk = stream.read(min(_COPY_BUFFER_SIZE, remaining))
+        if not chunk:
+            raise IOError("Unexpected end of stream, {} bytes missing".format(remaining))
+        fout.write(chunk)
+        remaining -= len(chunk)
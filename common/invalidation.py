@@ -0,0 +1,99 @@
+# Broadcasts the cache invalidations between all the processes sharing the same mongo database
+# A capped collection is used as a message log, so it works on standalone servers as well (change streams require a replica set)
+import logging
+import sys
+import threading
+import uuid
+from typing import Callable, Union
+
+from pymongo import CursorType
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.errors import CollectionInvalid
+
+_DEFAULT_COLLECTION_SIZE = 4 * 1024 * 1024
+_RETRY_INTERVAL = 5
+
+
+class InvalidationBus:
+    """
+    Publishes (store, project, key) invalidations and delivers the invalidations published by the other processes to `on_invalidate`.
+    If the bus loses messages (the listener was disconnected), `on_reset` is called so the local caches can be dropped.
+    """
+
+    def __init__(self, collection: Collection, on_invalidate: Callable[[str, str, str], None] = None, on_reset: Callable[[], None] = None):
+        self._collection = collection
+        self._on_invalidate = on_invalidate
+        self._on_reset = on_reset
+        self._origin = uuid.uuid4().hex
+
+        self._closed = threading.Event()
+        self._listener = None
+
+    def publish(self, store: str, project_id: str, key: str) -> None:
+        try:
+            self._collection.insert_one({"origin": self._origin, "store": store, "project": project_id, "key": key})
+        except:
+            # the local cache is already invalidated, the other processes will catch up when their entry expires
+            logging.error("Error while trying to publish a cache invalidation. Error: %s", sys.exc_info()[1])
+
+    def start(self) -> None:
+        if self._on_invalidate is None or self._listener is not None:
+            return
+
+        self._listener = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+        self._listener.start()
+
+    def close(self) -> None:
+        self._closed.set()
+
+    def _listen(self) -> None:
+        # the messages are read in insertion ($natural) order, the ObjectIds of different processes are not ordered within a second
+        last_id = None
+        synced = False
+        while not self._closed.is_set():
+            try:
+                if not synced:
+                    # only the messages published from now on are relevant
+                    last = self._collection.find_one({}, sort=[("$natural", -1)])
+                    last_id = last["_id"] if last else None
+                    synced = True
+
+                # a new cursor starts from the oldest message, so the messages up to the last one delivered are skipped
+                skipping = last_id is not None
+                cursor = self._collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive and not self._closed.is_set():
+                    for message in cursor:
+                        if skipping:
+                            skipping = message["_id"] != last_id
+                            continue
+
+                        last_id = message["_id"]
+                        if message.get("origin", None) != self._origin:
+                            self._on_invalidate(message.get("store", None), message.get("project", None), message.get("key", None))
+
+                    if skipping:
+                        # the last message delivered was overwritten in the capped collection, the ones after it may be lost
+                        logging.warning("The cache invalidation listener fell behind, the local caches are reset")
+                        skipping = False
+                        if self._on_reset:
+                            self._on_reset()
+            except:
+                logging.error("Error while listening for cache invalidations. Error: %s", sys.exc_info()[1])
+                # the messages sent in the meantime are lost
+                synced = False
+                if self._on_reset:
+                    self._on_reset()
+
+            self._closed.wait(_RETRY_INTERVAL)
+
+
+def setup_invalidation_collection(db: Database, collection_name: str, size: int = _DEFAULT_COLLECTION_SIZE) -> Union[Collection, None]:
+    try:
+        return db.create_collection(collection_name, capped=True, size=size)
+    except CollectionInvalid:
+        collection = db[collection_name]
+        if not collection.options().get("capped", False):
+            logging.error("The cache invalidation collection '%s' is not capped, the invalidation bus is disabled", collection_name)
+            return None
+        return collection
@@ -0,0 +1,134 @@
+# Operational metrics exported in the Prometheus text format (https://prometheus.io/docs/instrumenting/exposition_formats/)
+# The metrics are kept in memory by every process and rendered on each scrape, so no client library is needed
+import bisect
+import threading
+from typing import Dict, Iterable, Tuple
+
+from pymongo import monitoring
+
+CONTENT_TYPE_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+# in seconds, from cached metadata reads to large uploads
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Thread-safe histogram of observations by label values.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels, None)
+            if series is None:
+                series = self._series[labels] = {"buckets": [0] * (len(self.buckets) + 1), "count": 0, "sum": 0.0}
+            series["buckets"][bisect.bisect_left(self.buckets, value)] += 1
+            series["count"] += 1
+            series["sum"] += value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict]:
+        with self._lock:
+            return {labels: {"buckets": list(series["buckets"]), "count": series["count"], "sum": series["sum"]}
+                    for labels, series in self._series.items()}
+
+
+class MongoCommandStats(monitoring.CommandListener):
+    """
+    Records the latency and the failures of the mongo commands, by command and collection.
+    Register it with `pymongo.monitoring.register` before the mongo clients are created.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.latency = Histogram(buckets=buckets)
+        self._failures = {}
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def failures(self) -> Dict[Tuple[str, str], int]:
+        with self._lock:
+            return dict(self._failures)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = _command_collection(event.command_name, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self.latency.observe(self._labels(event), event.duration_micros / 1000000)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        labels = self._labels(event)
+        self.latency.observe(labels, event.duration_micros / 1000000)
+        with self._lock:
+            self._failures[labels] = self._failures.get(labels, 0) + 1
+
+    def _labels(self, event) -> Tuple[str, str]:
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "")
+        return event.command_name, collection
+
+
+class MetricsWriter:
+    """
+    Renders metric families in the Prometheus text format.
+    """
+
+    def __init__(self, prefix: str = "ove_am_"):
+        self.prefix = prefix
+        self._lines = []
+
+    def counter(self, name: str, documentation: str, label_names: Tuple[str, ...], values: Dict[Tuple, float]) -> None:
+        self._family(name, documentation, "counter", label_names, values)
+
+    def gauge(self, name: str, documentation: str, label_names: Tuple[str, ...], values: Dict[Tuple, float]) -> None:
+        self._family(name, documentation, "gauge", label_names, values)
+
+    def histogram(self, name: str, documentation: str, label_names: Tuple[str, ...], histogram: Histogram) -> None:
+        name = self.prefix + name
+        self._header(name, documentation, "histogram")
+        for labels, series in sorted(histogram.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + [float("inf")], series["buckets"]):
+                cumulative += count
+                self._lines.append("{}_bucket{} {}".format(name, _labels(label_names + ("le",), labels + (_number(bound),)), cumulative))
+            self._lines.append("{}_count{} {}".format(name, _labels(label_names, labels), series["count"]))
+            self._lines.append("{}_sum{} {}".format(name, _labels(label_names, labels), _number(series["sum"])))
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+    def _family(self, name: str, documentation: str, metric_type: str, label_names: Tuple[str, ...], values: Dict[Tuple, float]) -> None:
+        name = self.prefix + name
+        self._header(name, documentation, metric_type)
+        for labels, value in sorted(values.items()):
+            self._lines.append("{}{} {}".format(name, _labels(label_names, labels), _number(value)))
+
+    def _header(self, name: str, documentation: str, metric_type: str) -> None:
+        self._lines.append("# HELP {} {}".format(name, documentation))
+        self._lines.append("# TYPE {} {}".format(name, metric_type))
+
+
+def _command_collection(command_name: str, command: Dict) -> str:
+    if command_name == "getMore":
+        return str(command.get("collection", ""))
+    target = command.get(command_name, None)
+    return target if isinstance(target, str) else ""
+
+
+def _labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = ['{}="{}"'.format(name, _escape(value)) for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
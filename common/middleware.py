@@ -1,3 +1,5 @@
+import hashlib
+
 import falcon
 
 from common.consts import HTTP_WRITE_METHODS
@@ -34,3 +36,25 @@ class CORSComponent:
                 ('Access-Control-Allow-Headers', allow_headers),
                 ('Access-Control-Max-Age', '86400'),  # 24 hours
             ))
+
+
+class ConditionalGet:
+    # Adds a strong ETag, the hash of the serialized body, to the GET responses of the resources declaring `conditional_get`
+    # and answers 304 Not Modified without a body when the client sends the same ETag in If-None-Match
+    def process_response(self, req: falcon.Request, resp: falcon.Response, resource, req_succeeded):
+        if not req_succeeded or req.method != "GET" or not getattr(resource, "conditional_get", False):
+            return
+
+        if resp.status != falcon.HTTP_200 or resp.media is None:
+            return
+
+        etag = hashlib.sha1(resp.data).hexdigest()
+        resp.etag = etag
+        # the responses depend on the user access, so only the client may store them and it has to revalidate them every time
+        resp.cache_control = ["private", "no-cache"]
+
+        if_none_match = req.if_none_match
+        if if_none_match and ("*" in if_none_match or etag in if_none_match):
+            resp.status = falcon.HTTP_304
+            resp.media = None
+            resp.delete_header("Content-Type")
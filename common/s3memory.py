@@ -0,0 +1,222 @@
+# In-memory replacement of the Minio client, used to run the AM without an object store
+# Every call can be slowed down by a fixed latency and a bandwidth limit, and is counted by operation, so the overhead of the
+# service itself can be measured (and regression tested) separately from the store
+import hashlib
+import io
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List
+
+from minio.definitions import Bucket, Object
+from minio.error import NoSuchKey, NoSuchBucket, BucketAlreadyOwnedByYou, NoSuchUpload
+
+from common.consts import CONFIG_MEMORY_LATENCY, CONFIG_MEMORY_BANDWIDTH
+
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class MemoryResponse(io.BytesIO):
+    """
+    Mimics the urllib3 responses returned by the Minio client.
+    """
+
+    def stream(self, amt: int = 2 ** 16) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(amt)
+            if not chunk:
+                break
+            yield chunk
+
+    def release_conn(self) -> None:
+        pass
+
+
+class MemoryClient:
+    """
+    Implements the subset of the Minio client api used by the S3Manager, keeping the buckets in memory.
+    `latency` (in seconds) is added to every call and the data is transferred at `bandwidth` bytes per second (0 is unlimited).
+    """
+
+    def __init__(self, latency: float = 0.0, bandwidth: float = 0.0):
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+        self._buckets = {}
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+        self._calls = {}
+        self._stats_lock = threading.Lock()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {operation: dict(counters) for operation, counters in self._calls.items()}
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._calls.clear()
+
+    def _call(self, operation: str, size: int = 0) -> None:
+        with self._stats_lock:
+            counters = self._calls.setdefault(operation, {"calls": 0, "bytes": 0})
+            counters["calls"] += 1
+            counters["bytes"] += size
+
+        delay = self.latency + (size / self.bandwidth if self.bandwidth > 0 else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _bucket(self, bucket_name: str) -> Dict:
+        bucket = self._buckets.get(bucket_name, None)
+        if bucket is None:
+            raise NoSuchBucket(bucket_name)
+        return bucket
+
+    def _object(self, bucket_name: str, object_name: str) -> Dict:
+        with self._lock:
+            obj = self._bucket(bucket_name)["objects"].get(object_name, None)
+        if obj is None:
+            raise NoSuchKey(object_name)
+        return obj
+
+    def _store(self, bucket_name: str, object_name: str, data: bytes) -> str:
+        etag = hashlib.md5(data).hexdigest()
+        with self._lock:
+            self._bucket(bucket_name)["objects"][object_name] = {"data": data, "etag": etag, "last_modified": _now()}
+        return etag
+
+    def make_bucket(self, bucket_name: str, location: str = "us-east-1") -> None:
+        self._call("make_bucket")
+        with self._lock:
+            if bucket_name in self._buckets:
+                raise BucketAlreadyOwnedByYou(bucket_name)
+            self._buckets[bucket_name] = {"created": _now(), "objects": {}}
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        self._call("bucket_exists")
+        return bucket_name in self._buckets
+
+    def list_buckets(self) -> List[Bucket]:
+        self._call("list_buckets")
+        with self._lock:
+            return [Bucket(name, bucket["created"]) for name, bucket in sorted(self._buckets.items())]
+
+    def list_objects(self, bucket_name: str, prefix: str = "", recursive: bool = False) -> Iterator[Object]:
+        return self._list("list_objects", bucket_name=bucket_name, prefix=prefix, recursive=recursive)
+
+    def list_objects_v2(self, bucket_name: str, prefix: str = "", recursive: bool = False, start_after: str = "") -> Iterator[Object]:
+        return self._list("list_objects_v2", bucket_name=bucket_name, prefix=prefix, recursive=recursive, start_after=start_after)
+
+    def _list(self, operation: str, bucket_name: str, prefix: str, recursive: bool, start_after: str = "") -> Iterator[Object]:
+        self._call(operation)
+        prefix = prefix or ""
+        with self._lock:
+            objects = sorted(self._bucket(bucket_name)["objects"].items())
+
+        folders = set()
+        for name, obj in objects:
+            if not name.startswith(prefix) or name <= (start_after or ""):
+                continue
+
+            separator = name.find("/", len(prefix))
+            if not recursive and separator >= 0:
+                folder = name[:separator + 1]
+                if folder not in folders:
+                    folders.add(folder)
+                    yield Object(bucket_name, folder, None, None, 0, is_dir=True)
+            else:
+                yield Object(bucket_name, name, obj["last_modified"], obj["etag"], len(obj["data"]))
+
+    def stat_object(self, bucket_name: str, object_name: str) -> Object:
+        self._call("stat_object")
+        obj = self._object(bucket_name, object_name)
+        return Object(bucket_name, object_name, obj["last_modified"].timetuple(), obj["etag"], len(obj["data"]))
+
+    def get_object(self, bucket_name: str, object_name: str) -> MemoryResponse:
+        data = self._object(bucket_name, object_name)["data"]
+        self._call("get_object", size=len(data))
+        return MemoryResponse(data)
+
+    def get_partial_object(self, bucket_name: str, object_name: str, offset: int = 0, length: int = 0) -> MemoryResponse:
+        data = self._object(bucket_name, object_name)["data"]
+        data = data[offset:offset + length] if length else data[offset:]
+        self._call("get_partial_object", size=len(data))
+        return MemoryResponse(data)
+
+    def fget_object(self, bucket_name: str, object_name: str, file_path: str) -> Object:
+        data = self._object(bucket_name, object_name)["data"]
+        self._call("fget_object", size=len(data))
+        with open(file_path, mode="wb") as fout:
+            fout.write(data)
+        return self.stat_object(bucket_name, object_name)
+
+    def put_object(self, bucket_name: str, object_name: str, data: Any, length: int, content_type: str = None, metadata: Dict = None,
+                   sse: Any = None, progress: Any = None, part_size: int = 0) -> str:
+        content = _read(data, length)
+        self._call("put_object", size=len(content))
+        return self._store(bucket_name, object_name, content)
+
+    def fput_object(self, bucket_name: str, object_name: str, file_path: str, content_type: str = None, metadata: Dict = None,
+                    sse: Any = None, progress: Any = None, part_size: int = 0) -> str:
+        with open(file_path, mode="rb") as fin:
+            content = fin.read()
+        self._call("fput_object", size=len(content))
+        return self._store(bucket_name, object_name, content)
+
+    def remove_object(self, bucket_name: str, object_name: str) -> None:
+        self._call("remove_object")
+        with self._lock:
+            self._bucket(bucket_name)["objects"].pop(object_name, None)
+
+    def _new_multipart_upload(self, bucket_name: str, object_name: str, metadata: Dict = None, sse: Any = None) -> str:
+        self._call("new_multipart_upload")
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._bucket(bucket_name)
+            self._uploads[upload_id] = {}
+        return upload_id
+
+    def _do_put_object(self, bucket_name: str, object_name: str, part_data: bytes, part_size: int, upload_id: str = "", part_number: int = 0,
+                       metadata: Dict = None, sse: Any = None, progress: Any = None) -> str:
+        self._call("put_object_part", size=len(part_data))
+        with self._lock:
+            parts = self._uploads.get(upload_id, None)
+            if parts is None:
+                raise NoSuchUpload(upload_id)
+            parts[part_number] = bytes(part_data)
+        return hashlib.md5(part_data).hexdigest()
+
+    def _complete_multipart_upload(self, bucket_name: str, object_name: str, upload_id: str, uploaded_parts: Dict) -> None:
+        self._call("complete_multipart_upload")
+        with self._lock:
+            parts = self._uploads.pop(upload_id, None)
+        if parts is None:
+            raise NoSuchUpload(upload_id)
+        self._store(bucket_name, object_name, b"".join(parts[part_number] for part_number in sorted(uploaded_parts.keys())))
+
+    def _remove_incomplete_upload(self, bucket_name: str, object_name: str, upload_id: str) -> None:
+        self._call("remove_incomplete_upload")
+        with self._lock:
+            self._uploads.pop(upload_id, None)
+
+
+def create_memory_client(store_config: Dict) -> MemoryClient:
+    return MemoryClient(latency=store_config.get(CONFIG_MEMORY_LATENCY, 0.0) or 0.0, bandwidth=store_config.get(CONFIG_MEMORY_BANDWIDTH, 0.0) or 0.0)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _read(data: Any, length: int) -> bytes:
+    chunks = []
+    remaining = length
+    while remaining > 0:
+        chunk = data.read(min(remaining, _COPY_BUFFER_SIZE))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
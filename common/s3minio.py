@@ -1,30 +1,93 @@
+import copy
+import datetime
 import io
 import json
 import logging
 import sys
-from typing import Union, Dict, Callable, List, Any, Tuple
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Union, Dict, Callable, List, Any, Tuple, Iterable, Set
 
 from minio import Minio
 from minio.error import ResponseError, NoSuchKey
-from urllib3 import HTTPResponse
+from urllib3 import HTTPResponse, PoolManager, Timeout
+from urllib3.util import Retry
 
-from common.consts import CONFIG_STORE_DEFAULT, CONFIG_STORE_NAME, CONFIG_STORES, CONFIG_ENDPOINT, CONFIG_ACCESS_KEY, CONFIG_SECRET_KEY, CONFIG_PROXY_URL, PROJECT_SECTIONS
+from common.cache import TTLCache
+from common.consts import CONFIG_STORE_DEFAULT, CONFIG_STORE_NAME, CONFIG_STORES, CONFIG_ENDPOINT, CONFIG_ACCESS_KEY, CONFIG_SECRET_KEY, CONFIG_PROXY_URL
+from common.consts import CONFIG_LIST_WORKERS, OVE_CATALOG, OVE_UPDATED, CONFIG_PART_SIZE, CONFIG_UPLOAD_WORKERS, CONFIG_PART_RETRIES
+from common.consts import CONFIG_DOWNLOAD_WORKERS, CONFIG_DOWNLOAD_THRESHOLD, CONFIG_FOLDER_UPLOAD_WORKERS, CONFIG_BATCH_WORKERS
 from common.consts import DEFAULT_CREDENTIALS_CONFIG, S3_SEPARATOR, OVE_META, PROJECT_FILE, S3_OBJECT_EXTENSION, MAX_LIST_ITEMS
-from common.consts import PROJECT_BASIC_TEMPLATE, PROJECT_METADATA_SECTION
+from common.consts import PROJECT_BASIC_TEMPLATE, PROJECT_METADATA_SECTION, CONFIG_CACHE, CONFIG_CACHE_ACL_TTL, CONFIG_CACHE_ACL_SIZE
+from common.consts import CONFIG_CACHE_META_TTL, CONFIG_CACHE_META_SIZE, CONFIG_HTTP_CLIENT, CONFIG_HTTP_POOL_SIZE, CONFIG_HTTP_CONNECT_TIMEOUT
+from common.consts import CONFIG_HTTP_READ_TIMEOUT, CONFIG_HTTP_RETRIES, CONFIG_HTTP_BACKOFF, CONFIG_STORE_CALLS, CONFIG_PROFILING
 from common.entities import OveAssetMeta, OveProjectMeta, OveProjectAccessMeta, UserAccessMeta
 from common.errors import ValidationError, InvalidStoreError, InvalidAssetError, InvalidObjectError, StreamNotFoundError, InvalidProjectError
 from common.filters import DEFAULT_FILTER
+from common.metrics import Histogram
+from common.s3transfer import MultipartUploader, RangedDownloader, retry
+from common.store_util import ProjectDescriptor, format_date, project_meta, has_group_access, get_project_type, encode_cursor, decode_cursor
+from common.store_util import validate_object_id
+from common.storecalls import InstrumentedClient, StoreCallStats, propagate
 from common.util import append_slash
 
 _DEFAULT_LABEL = "*"
 _DEFAULT_OBJECT_ENCODING = "utf-8"
 _DEFAULT_STORE_LOCATION = "us-east-1"
+_DEFAULT_ACL_CACHE_TTL = 30
+_DEFAULT_ACL_CACHE_SIZE = 4096
+_DEFAULT_META_CACHE_TTL = 30
+_DEFAULT_META_CACHE_SIZE = 4096
+# cached in place of the objects that do not exist on the store
+_MISSING = object()
+_DEFAULT_LIST_WORKERS = 8
+_DEFAULT_BATCH_WORKERS = 8
+_DEFAULT_PART_SIZE = 16 * 1024 * 1024
+_DEFAULT_UPLOAD_WORKERS = 4
+_DEFAULT_PART_RETRIES = 3
+_DEFAULT_DOWNLOAD_WORKERS = 4
+_DEFAULT_DOWNLOAD_THRESHOLD = 64 * 1024 * 1024
+_DEFAULT_FOLDER_UPLOAD_WORKERS = 8
+_DEFAULT_RETRY_BACKOFF = 0.5
+_DEFAULT_HTTP_POOL_SIZE = 32
+_DEFAULT_HTTP_CONNECT_TIMEOUT = 10
+_DEFAULT_HTTP_READ_TIMEOUT = 120
+_DEFAULT_HTTP_RETRIES = 3
+_DEFAULT_HTTP_BACKOFF = 0.2
+_DEFAULT_CLIENT_CACHE_SIZE = 8
+_DEFAULT_CLIENT_IDLE_TIMEOUT = 300
+# bump this when the catalog layout changes, older catalogs are treated as stale and rebuilt
+_CATALOG_FORMAT = 1
+_CATALOG_WRITE_ATTEMPTS = 5
 
 
 class S3Manager:
-    def __init__(self):
+    # client_factory builds the client of a store from its config, see common.s3memory for an in-memory store
+    def __init__(self, client_factory: Callable[[Dict], Minio] = None):
+        self._client_factory = client_factory or _create_client
+        # every call made by the store clients is counted here
+        self._call_stats = StoreCallStats(latency=Histogram())
+        self._store_calls_config = {}
+        self._profiling_config = {}
         self._clients = {}
         self._store_config = {}
+        # (store, project) -> access groups, invalidated by set_project_access_meta
+        self._acl_cache = TTLCache(max_size=_DEFAULT_ACL_CACHE_SIZE, ttl=_DEFAULT_ACL_CACHE_TTL)
+        # (store, project, key) -> decoded json metadata or _MISSING, invalidated by every write of the key
+        self._meta_cache = TTLCache(max_size=_DEFAULT_META_CACHE_SIZE, ttl=_DEFAULT_META_CACHE_TTL)
+        # store -> thread pool used to fan-out the per-project / per-asset requests
+        self._executors = {}
+        self._executors_lock = threading.Lock()
+        # (store, project) -> lock of the catalog updates
+        self._catalog_locks = {}
+        self._catalog_locks_lock = threading.Lock()
+        # broadcasts the local invalidations to the other processes, see common.invalidation
+        self._publisher = None
+        # clients created by setup, kept across clear() so the next tasks reuse the keep-alive connections
+        self._setup_clients = _ClientCache(client_factory=self._new_client, max_size=_DEFAULT_CLIENT_CACHE_SIZE,
+                                           idle_timeout=_DEFAULT_CLIENT_IDLE_TIMEOUT)
 
     def load(self, config_file: str = DEFAULT_CREDENTIALS_CONFIG):
         try:
@@ -32,12 +95,18 @@ class S3Manager:
                 config = json.load(fin)
                 default_store = config.get(CONFIG_STORE_DEFAULT, None)
 
+                self._store_calls_config = config.get(CONFIG_STORE_CALLS, {}) or {}
+                self._profiling_config = config.get(CONFIG_PROFILING, {}) or {}
+
+                cache_config = config.get(CONFIG_CACHE, {}) or {}
+                self._acl_cache = TTLCache(max_size=cache_config.get(CONFIG_CACHE_ACL_SIZE, _DEFAULT_ACL_CACHE_SIZE),
+                                           ttl=cache_config.get(CONFIG_CACHE_ACL_TTL, _DEFAULT_ACL_CACHE_TTL))
+                self._meta_cache = TTLCache(max_size=cache_config.get(CONFIG_CACHE_META_SIZE, _DEFAULT_META_CACHE_SIZE),
+                                            ttl=cache_config.get(CONFIG_CACHE_META_TTL, _DEFAULT_META_CACHE_TTL))
+
                 for client_config in config.get(CONFIG_STORES, []):
                     store_id = client_config.get(CONFIG_STORE_NAME, "")
-                    client = Minio(endpoint=client_config.get(CONFIG_ENDPOINT, ""),
-                                   access_key=client_config.get(CONFIG_ACCESS_KEY, ""),
-                                   secret_key=client_config.get(CONFIG_SECRET_KEY, ""),
-                                   secure=False)
+                    client = self._new_client(client_config)
                     self._clients[store_id] = client
                     self._store_config[store_id] = client_config
                     if default_store == store_id:
@@ -48,16 +117,56 @@ class S3Manager:
             logging.error("Error while trying to load store config. Error: %s", sys.exc_info()[1])
 
     def setup(self, store_config: Dict):
-        client = Minio(endpoint=store_config.get(CONFIG_ENDPOINT, ""),
-                       access_key=store_config.get(CONFIG_ACCESS_KEY, ""),
-                       secret_key=store_config.get(CONFIG_SECRET_KEY, ""),
-                       secure=False)
+        client = self._setup_clients.get(store_config)
         self._clients[_DEFAULT_LABEL] = client
         self._store_config[_DEFAULT_LABEL] = store_config
 
     def clear(self):
+        with self._executors_lock:
+            for executor in self._executors.values():
+                executor.shutdown(wait=False)
+            self._executors.clear()
+
         self._clients.clear()
         self._store_config.clear()
+        self.reset_caches()
+
+    def _new_client(self, client_config: Dict) -> Minio:
+        return InstrumentedClient(self._client_factory(client_config), stats=self._call_stats)
+
+    def store_call_stats(self) -> Dict:
+        return self._call_stats.snapshot()
+
+    def store_call_latency(self) -> Histogram:
+        return self._call_stats.latency
+
+    # settings of the per-request reports of the store calls
+    def store_calls_config(self) -> Dict:
+        return self._store_calls_config
+
+    # settings of the request profiler
+    def profiling_config(self) -> Dict:
+        return self._profiling_config
+
+    def set_invalidation_publisher(self, publisher: Callable[[str, str, str], None]) -> None:
+        self._publisher = publisher
+
+    # Applies an invalidation published by another process
+    def apply_invalidation(self, store: str, project_id: str, key: str) -> None:
+        self._meta_cache.invalidate((store, project_id, key))
+        if key == OVE_META:
+            self._acl_cache.invalidate((store, project_id))
+
+    def reset_caches(self) -> None:
+        self._acl_cache.clear()
+        self._meta_cache.clear()
+
+    def cache_stats(self) -> Dict:
+        return {"acl": self._acl_cache.stats(), "meta": self._meta_cache.stats()}
+
+    # Connection pool usage of every store, idle connections are kept alive and reused by the next requests
+    def pool_stats(self) -> Dict:
+        return {store_id: _pool_stats(client) for store_id, client in self._clients.items() if store_id != _DEFAULT_LABEL or len(self._clients) == 1}
 
     # Open a connection to the S3 storage
     def _get_connection(self, store_id: str = None) -> Union[Minio, None]:
@@ -76,92 +185,288 @@ class S3Manager:
         store_id = store_id if store_id else _DEFAULT_LABEL
         return self._store_config.get(store_id, None)
 
+    # the default label and the default store name must share cache entries
+    def _cache_store(self, store_id: str = None) -> str:
+        client_config = self.get_store_config(store_id) or {}
+        return client_config.get(CONFIG_STORE_NAME, None) or store_id or _DEFAULT_LABEL
+
+    # Read-through cache of the small json documents (project.json, asset .ovemeta, objects)
+    # Returns None if the object does not exist, other store errors are raised and not cached
+    # The reads followed by a write must not use the cache: the invalidations from the other processes are asynchronous, so a cached copy
+    # could undo a newer write made by another process
+    def _read_json(self, client: Minio, project_id: str, key: str, store_id: str = None, use_cache: bool = True) -> Union[None, Dict]:
+        cache_key = (self._cache_store(store_id), project_id, key)
+        data = self._meta_cache.get(cache_key) if use_cache else None
+        if data is None:
+            generation = self._meta_cache.generation(cache_key)
+            try:
+                data = _decode_json(client.get_object(project_id, key))
+            except NoSuchKey:
+                data = _MISSING
+            self._meta_cache.put(cache_key, data, generation=generation)
+
+        # callers are free to change the result, so they never get the cached instance
+        return None if data is _MISSING else copy.deepcopy(data)
+
+    def _exists_json(self, client: Minio, project_id: str, key: str, store_id: str = None) -> bool:
+        data = self._meta_cache.get((self._cache_store(store_id), project_id, key))
+        if data is not None:
+            return data is not _MISSING
+
+        client.stat_object(project_id, key)
+        return True
+
+    def _write_json(self, client: Minio, project_id: str, key: str, data: Any, store_id: str = None) -> None:
+        try:
+            encoded, size = _encode_json(data)
+            client.put_object(project_id, key, encoded, size)
+        finally:
+            self._invalidate(project_id=project_id, key=key, store_id=store_id)
+
+    def _invalidate(self, project_id: str, key: str, store_id: str = None) -> None:
+        store = self._cache_store(store_id)
+        self.apply_invalidation(store=store, project_id=project_id, key=key)
+        # only the keys cached by _read_json are worth waking up the other processes for
+        if self._publisher is not None and _is_cached_key(key):
+            self._publisher(store, project_id, key)
+
+    def _get_executor(self, store_id: str = None, workers_config: str = CONFIG_LIST_WORKERS, default_workers: int = _DEFAULT_LIST_WORKERS,
+                      name: str = "s3") -> Union[ThreadPoolExecutor, None]:
+        client_config = self.get_store_config(store_id) or {}
+        max_workers = client_config.get(workers_config, default_workers)
+        if not max_workers or max_workers <= 1:
+            return None
+
+        store = self._cache_store(store_id)
+        with self._executors_lock:
+            executor = self._executors.get((store, workers_config), None)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name + "-" + store)
+                self._executors[(store, workers_config)] = executor
+            return executor
+
+    # Apply fn on all the items using the store thread pool, preserving the order of the results
+    def _fan_out(self, fn: Callable, items: Iterable, store_id: str = None) -> List:
+        executor = self._get_executor(store_id)
+        if executor is None:
+            return [fn(item) for item in items]
+        else:
+            return list(executor.map(propagate(fn), items))
+
+    # Apply fn on the items of a batch request, preserving the order of the results
+    # The batch pool is separate from the list pool, so the items can fan out themselves without waiting on each other
+    def map_batch(self, fn: Callable, items: Iterable, store_id: str = None) -> List:
+        executor = self._get_executor(store_id, workers_config=CONFIG_BATCH_WORKERS, default_workers=_DEFAULT_BATCH_WORKERS, name="s3-batch")
+        if executor is None:
+            return [fn(item) for item in items]
+        else:
+            return list(executor.map(propagate(fn), items))
+
     def list_stores(self) -> List[str]:
         return [store for store in self._clients.keys() if store != _DEFAULT_LABEL]
 
     # List the projects in an s3 storage (returning the names)
     def list_projects(self, access: UserAccessMeta, store_id: str = None, metadata: bool = False, result_filter: Callable = None) -> List[Dict]:
-        def _last_modified(project_id) -> str:
-            ts = [a.last_modified for a in client.list_objects(project_id, prefix=None, recursive=False)]
-            ts = [a for a in ts if a is not None]
-            if len(ts) > 0:
-                return '{0:%Y-%m-%d %H:%M:%S}'.format(max(ts))
-            else:
-                return ''
+        # the project metadata is expensive to compute, the projects are evaluated concurrently
+        # errors are isolated so one broken project does not hide the others
+        def _project_item(bucket) -> Union[None, Dict]:
+            try:
+                descriptor = self._load_project_descriptor(store_id=store_id, project_id=bucket.name)
+                if not (result_filter(descriptor.meta) and descriptor.has_access(groups=access.read_groups, is_admin=access.admin_access)):
+                    return None
+
+                item = descriptor.to_public_json(access=access)
+                item["creationDate"] = format_date(bucket.creation_date)
+                item["updateDate"] = self._last_modified(client=client, project_id=bucket.name)
+                return item
+            except:
+                logging.error("Error while trying to list project '%s'. Error: %s", bucket.name, sys.exc_info()[1])
+                return None
 
         client = self._get_connection(store_id)
         try:
             if metadata:
                 result_filter = result_filter if result_filter is not None else DEFAULT_FILTER
-                # has_object is an expensive metadata to compute
-                result = []
-                for bucket in client.list_buckets():
-                    meta = self.get_project_meta(store_id=store_id, project_id=bucket.name, ignore_errors=True)
-                    if result_filter(meta) and self.has_access(store_id=store_id, project_id=bucket.name, groups=access.read_groups, is_admin=access.admin_access):
-                        item = meta.to_public_json()
-                        item["id"] = bucket.name
-                        item["creationDate"] = '{0:%Y-%m-%d %H:%M:%S}'.format(bucket.creation_date)
-                        item["updateDate"] = _last_modified(bucket.name)
-                        item["hasProject"] = self.has_object(store_id=store_id, project_id=bucket.name, object_id="project")
-                        item["projectType"] = self.project_type(store_id=store_id, project_id=bucket.name)
-                        item["access"] = self.get_project_access_meta(store_id=store_id, project_id=bucket.name).groups
-                        item["read_access"] = True
-                        item["write_access"] = self.has_access(store_id=store_id, project_id=bucket.name, groups=access.write_groups, is_admin=access.admin_access)
-
-                        result.append(item)
-
-                return result
+                return [item for item in self._fan_out(_project_item, client.list_buckets(), store_id=store_id) if item is not None]
             else:
+                buckets = list(client.list_buckets())
+                allowed = self._fan_out(lambda bucket: self.has_access(store_id=store_id, project_id=bucket.name, groups=access.read_groups,
+                                                                       is_admin=access.admin_access), buckets, store_id=store_id)
                 return [{
                     "id": bucket.name,
-                    "creationDate": '{0:%Y-%m-%d %H:%M:%S}'.format(bucket.creation_date),
-                } for bucket in client.list_buckets() if self.has_access(store_id=store_id, project_id=bucket.name, groups=access.read_groups, is_admin=access.admin_access)]
+                    "creationDate": format_date(bucket.creation_date),
+                } for bucket, has_access in zip(buckets, allowed) if has_access]
         except:
             logging.error("Error while trying to list store. Error: %s", sys.exc_info()[1])
             return []
 
+    # Every write bumps the project update marker, so the project list does not have to list the bucket to find the update date
+    def _touch_project(self, client: Minio, project_id: str) -> None:
+        try:
+            data, size = _encode_json({"updated": format_date(datetime.datetime.utcnow())})
+            client.put_object(project_id, OVE_UPDATED, data, size)
+        except:
+            logging.error("Error while trying to update the project marker. Error: %s", sys.exc_info()[1])
+
+    def _last_modified(self, client: Minio, project_id: str) -> str:
+        try:
+            return _decode_json(client.get_object(project_id, OVE_UPDATED))["updated"]
+        except NoSuchKey:
+            pass
+        except:
+            logging.error("Error while trying to read the project marker of '%s'. Error: %s", project_id, sys.exc_info()[1])
+
+        # projects without a (readable) marker are listed instead, the marker is only saved by the next write to the project
+        try:
+            ts = [a.last_modified for a in client.list_objects(project_id, prefix=None, recursive=False)]
+            ts = [a for a in ts if a is not None]
+            return format_date(max(ts)) if len(ts) > 0 else ''
+        except:
+            logging.error("Error while trying to list project '%s'. Error: %s", project_id, sys.exc_info()[1])
+            return ''
+
     # List the assets in an s3 bucket
-    def list_assets(self, project_id: str, store_id: str = None, result_filter: Callable = None) -> List[Dict]:
+    # The asset metadata is read from the project catalog, which is rebuilt if it is missing, stale or a refresh is requested
+    # The folders are listed on every call, so the assets missing from the catalog (e.g. a write lost by another process) are still found
+    def list_assets(self, project_id: str, store_id: str = None, result_filter: Callable = None, refresh: bool = False) -> List[Dict]:
         def _format(name: str, meta: OveAssetMeta) -> Union[str, Dict]:
             return meta.to_public_json() if meta else {"name": name, "project": project_id}
 
         result_filter = result_filter if result_filter is not None else DEFAULT_FILTER
         client = self._get_connection(store_id)
         try:
-            assets = [a.object_name[0:-1] for a in client.list_objects(project_id, prefix=None, recursive=False) if a.is_dir]
+            catalog = None if refresh else self._read_catalog(client=client, project_id=project_id)[0]
+            if catalog is None:
+                catalog = self._rebuild_catalog(client=client, project_id=project_id, store_id=store_id)
+
+            metas = {asset_id: _catalog_meta(asset_id, data) for asset_id, data in catalog.get("assets", {}).items()}
+
+            # folders without metadata are not in the catalog either, the folders missing from it are checked concurrently
+            folders = [a.object_name[0:-1] for a in client.list_objects(project_id, prefix=None, recursive=False) if a.is_dir]
+            missing = [asset_id for asset_id in folders if asset_id not in metas]
+            loaded = dict(zip(missing, self._fan_out(lambda asset_id: self.get_asset_meta(project_id, asset_id, store_id, ignore_errors=True),
+                                                     missing, store_id=store_id)))
+            found = {asset_id: meta for asset_id, meta in loaded.items() if meta is not None}
+            if len(found) > 0:
+                logging.info("Adding %s assets missing from the asset catalog of %s ...", len(found), project_id)
+                self._update_catalog(client=client, project_id=project_id, metas=found, store_id=store_id)
+
+            metas = {asset_id: metas[asset_id] if asset_id in metas else loaded[asset_id] for asset_id in folders}
+            if not result_filter(None):
+                metas = {asset_id: meta for asset_id, meta in metas.items() if meta is not None}
+
             # For the asset list, we switch to a public meta object
-            metas = {asset_id: self.get_asset_meta(project_id, asset_id, store_id, ignore_errors=True) for asset_id in assets}
-            return [_format(name, meta) for name, meta in metas.items() if result_filter(meta)]
+            return [_format(name, metas[name]) for name in sorted(metas.keys()) if result_filter(metas[name])]
         except:
             logging.error("Error while trying to list assets. Error: %s", sys.exc_info()[1])
             return []
 
-        # List the assets in an s3 bucket
-
-    def list_files(self, project_id: str, asset_id: str, store_id: str = None, version: str = None) -> List[Dict]:
-        client = self._get_connection(store_id)
+    # Returns the catalog and, if requested, the etag it was read with, or (None, None) if it is missing or stale
+    def _read_catalog(self, client: Minio, project_id: str, with_etag: bool = False) -> Tuple[Union[None, Dict], Union[None, str]]:
         try:
-            meta = self.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id)
-            version = version or str(meta.version)
-            prefix = asset_id + "/" + version + "/"
+            etag = client.stat_object(project_id, OVE_CATALOG).etag if with_etag else None
+            catalog = _decode_json(client.get_object(project_id, OVE_CATALOG))
+            return (catalog, etag) if catalog.get("format", None) == _CATALOG_FORMAT else (None, None)
+        except:
+            return None, None
 
-            result = []
-            for a in client.list_objects(project_id, prefix=prefix, recursive=True):
-                if len(result) > MAX_LIST_ITEMS:
-                    break
+    def _write_catalog(self, client: Minio, project_id: str, catalog: Dict) -> None:
+        catalog["format"] = _CATALOG_FORMAT
+        data, size = _encode_json(catalog)
+        client.put_object(project_id, OVE_CATALOG, data, size)
+
+    # The catalog writes of a project are serialized in this process, and checked against the etag they were read with for the others
+    def _catalog_lock(self, project_id: str, store_id: str = None) -> threading.Lock:
+        with self._catalog_locks_lock:
+            return self._catalog_locks.setdefault((self._cache_store(store_id), project_id), threading.Lock())
 
-                if not a.is_dir:
-                    result.append({
-                        "name": a.object_name[len(prefix):],
-                        "url": meta.proxy_url + project_id + "/" + a.object_name,
-                        "default": meta.filename == a.object_name[len(prefix):]
-                    })
+    def _rebuild_catalog(self, client: Minio, project_id: str, store_id: str = None) -> Dict:
+        logging.info("Rebuilding the asset catalog of %s ...", project_id)
+        assets = [a.object_name[0:-1] for a in client.list_objects(project_id, prefix=None, recursive=False) if a.is_dir]
+        metas = self._fan_out(lambda asset_id: self.get_asset_meta(project_id, asset_id, store_id, ignore_errors=True), assets, store_id=store_id)
 
-            return result
+        catalog = {"assets": {asset_id: meta.to_json() for asset_id, meta in zip(assets, metas) if meta is not None}}
+        try:
+            with self._catalog_lock(project_id=project_id, store_id=store_id):
+                self._write_catalog(client=client, project_id=project_id, catalog=catalog)
+        except:
+            logging.error("Error while trying to save the asset catalog. Error: %s", sys.exc_info()[1])
+            # an older catalog (e.g. on refresh) must not be served instead
+            self._drop_catalog(client=client, project_id=project_id)
+        return catalog
+
+    def _update_catalog(self, client: Minio, project_id: str, metas: Dict[str, OveAssetMeta], store_id: str = None) -> None:
+        # a missing catalog is not created here, list_assets will rebuild it with all the assets on first use
+        # the store has no conditional writes, so the etag is checked again right before the write and the merge retried if it changed,
+        # then the catalog is read back in case another process overwrote it in the meantime
+        # list_assets only repairs the missing assets, so a catalog that could not be updated is dropped and rebuilt on the next list
+        entries = {asset_id: json.loads(json.dumps(meta.to_json())) for asset_id, meta in metas.items()}
+        with self._catalog_lock(project_id=project_id, store_id=store_id):
+            try:
+                for _ in range(_CATALOG_WRITE_ATTEMPTS):
+                    catalog, etag = self._read_catalog(client=client, project_id=project_id, with_etag=True)
+                    if catalog is None:
+                        return
+
+                    catalog.setdefault("assets", {}).update(entries)
+                    if client.stat_object(project_id, OVE_CATALOG).etag == etag:
+                        self._write_catalog(client=client, project_id=project_id, catalog=catalog)
+                        saved = self._read_catalog(client=client, project_id=project_id)[0] or {}
+                        if all(saved.get("assets", {}).get(asset_id, None) == entry for asset_id, entry in entries.items()):
+                            return
+                        break
+
+                logging.warning("The asset catalog of %s could not be updated, it will be rebuilt", project_id)
+            except:
+                logging.error("Error while trying to update the asset catalog. Error: %s", sys.exc_info()[1])
+
+            self._drop_catalog(client=client, project_id=project_id)
+
+    def _drop_catalog(self, client: Minio, project_id: str) -> None:
+        try:
+            client.remove_object(project_id, OVE_CATALOG)
+        except NoSuchKey:
+            pass
+        except:
+            logging.error("Error while trying to remove the asset catalog of %s. Error: %s", project_id, sys.exc_info()[1])
+
+    def list_files(self, project_id: str, asset_id: str, store_id: str = None, version: str = None) -> List[Dict]:
+        try:
+            return self.list_files_page(store_id=store_id, project_id=project_id, asset_id=asset_id, version=version)["items"]
         except:
             logging.error("Error while trying to list assets. Error: %s", sys.exc_info()[1])
             return []
 
+    # List one page of files of an asset version, the cursor returned can be used to request the next page
+    def list_files_page(self, project_id: str, asset_id: str, store_id: str = None, version: str = None, limit: int = MAX_LIST_ITEMS,
+                        cursor: str = None) -> Dict:
+        client = self._get_connection(store_id)
+        meta = self.get_asset_meta(store_id=store_id, project_id=project_id, asset_id=asset_id)
+        version = version or str(meta.version)
+        prefix = asset_id + "/" + version + "/"
+        start_after = decode_cursor(cursor, prefix=prefix) if cursor else ""
+        limit = max(1, min(limit or MAX_LIST_ITEMS, MAX_LIST_ITEMS))
+
+        result = []
+        last_name = None
+        has_more = False
+        for a in client.list_objects_v2(project_id, prefix=prefix, recursive=True, start_after=start_after):
+            if a.is_dir:
+                continue
+
+            if len(result) >= limit:
+                has_more = True
+                break
+
+            result.append({
+                "name": a.object_name[len(prefix):],
+                "url": meta.proxy_url + project_id + "/" + a.object_name,
+                "default": meta.filename == a.object_name[len(prefix):]
+            })
+            last_name = a.object_name
+
+        return {"items": result, "nextCursor": encode_cursor(last_name) if has_more else None}
+
     def check_exists(self, project_id: str, store_id: str = None) -> bool:
         client = self._get_connection(store_id)
         try:
@@ -184,8 +489,7 @@ class S3Manager:
         try:
             # minio interprets the slash as a directory
             meta_name = meta.id + S3_SEPARATOR + OVE_META
-            data, size = _encode_json(meta.to_json())
-            client.put_object(project_id, meta_name, data, size)
+            self._write_json(client=client, project_id=project_id, key=meta_name, data=meta.to_json(), store_id=store_id)
             meta.created()
             self.set_asset_meta(store_id=store_id, project_id=project_id, asset_id=meta.id, meta=meta)
             return meta
@@ -196,20 +500,74 @@ class S3Manager:
     def upload_asset(self, project_id: str, asset_id: str, filename: str, upload_filename: str, store_id: str = None) -> None:
         client = self._get_connection(store_id)
         try:
-            # filesize=os.stat(upfile.name).st_size
-            filepath = asset_id + S3_SEPARATOR + filename
-            client.fput_object(project_id, filepath, upload_filename)
-        except ResponseError:
+            self._upload_file(client=client, project_id=project_id, asset_id=asset_id, filename=filename, upload_filename=upload_filename, store_id=store_id)
+        except Exception:
+            logging.error("Error while trying to upload. Error: %s", sys.exc_info()[1])
+            raise ValidationError("Unable to upload asset to remote storage.")
+
+        self._touch_project(client=client, project_id=project_id)
+
+    # the asset files are never cached, so there is nothing to invalidate
+    def _upload_file(self, client: Minio, project_id: str, asset_id: str, filename: str, upload_filename: str, store_id: str = None) -> None:
+        self._get_uploader(store_id).upload_file(client, project_id, asset_id + S3_SEPARATOR + filename, upload_filename)
+
+    # Streams the data straight into a multipart upload, holding at most a few parts in memory
+    def upload_asset_stream(self, project_id: str, asset_id: str, filename: str, stream: io.RawIOBase, length: int, store_id: str = None) -> None:
+        client = self._get_connection(store_id)
+        try:
+            self._get_uploader(store_id).upload_stream(client, project_id, asset_id + S3_SEPARATOR + filename, stream, length)
+        except Exception:
             logging.error("Error while trying to upload. Error: %s", sys.exc_info()[1])
             raise ValidationError("Unable to upload asset to remote storage.")
 
+        self._touch_project(client=client, project_id=project_id)
+
+    # Uploads (filename, upload_filename) pairs concurrently over the store connection pool
+    # Returns the files that could not be uploaded, even after retrying, with the reason
+    def upload_assets(self, project_id: str, asset_id: str, uploads: List[Tuple[str, str]], store_id: str = None,
+                      progress: Callable[[int, int], None] = None) -> Dict[str, str]:
+        client = self._get_connection(store_id)
+        client_config = self.get_store_config(store_id) or {}
+        max_workers = client_config.get(CONFIG_FOLDER_UPLOAD_WORKERS, _DEFAULT_FOLDER_UPLOAD_WORKERS) or 1
+        retries = client_config.get(CONFIG_PART_RETRIES, _DEFAULT_PART_RETRIES)
+
+        def _upload(filename: str, upload_filename: str) -> None:
+            retry(lambda: self._upload_file(client=client, project_id=project_id, asset_id=asset_id, filename=filename, upload_filename=upload_filename,
+                                            store_id=store_id),
+                  retries=retries, backoff=_DEFAULT_RETRY_BACKOFF, description="{}/{}/{}".format(project_id, asset_id, filename))
+
+        failures = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-folder") as executor:
+            futures = {executor.submit(propagate(_upload), filename, upload_filename): filename for filename, upload_filename in uploads}
+            for count, future in enumerate(as_completed(futures), start=1):
+                if future.exception() is not None:
+                    failures[futures[future]] = str(future.exception())
+                if progress:
+                    progress(count, len(futures))
+
+        # the marker is updated once for the whole folder
+        self._touch_project(client=client, project_id=project_id)
+        return failures
+
+    def _get_uploader(self, store_id: str = None) -> MultipartUploader:
+        client_config = self.get_store_config(store_id) or {}
+        return MultipartUploader(part_size=client_config.get(CONFIG_PART_SIZE, _DEFAULT_PART_SIZE) or _DEFAULT_PART_SIZE,
+                                 concurrency=client_config.get(CONFIG_UPLOAD_WORKERS, _DEFAULT_UPLOAD_WORKERS) or _DEFAULT_UPLOAD_WORKERS,
+                                 retries=client_config.get(CONFIG_PART_RETRIES, _DEFAULT_PART_RETRIES))
+
+    def _get_downloader(self, store_id: str = None) -> RangedDownloader:
+        client_config = self.get_store_config(store_id) or {}
+        return RangedDownloader(range_size=client_config.get(CONFIG_PART_SIZE, _DEFAULT_PART_SIZE) or _DEFAULT_PART_SIZE,
+                                concurrency=client_config.get(CONFIG_DOWNLOAD_WORKERS, _DEFAULT_DOWNLOAD_WORKERS) or 1,
+                                threshold=client_config.get(CONFIG_DOWNLOAD_THRESHOLD, _DEFAULT_DOWNLOAD_THRESHOLD),
+                                retries=client_config.get(CONFIG_PART_RETRIES, _DEFAULT_PART_RETRIES))
+
     def download_asset(self, project_id: str, asset_id: str, filename: str, down_filename: str, store_id: str = None) -> None:
         client = self._get_connection(store_id)
         try:
-            # filesize=os.stat(upfile.name).st_size
             filepath = asset_id + S3_SEPARATOR + filename
-            client.fget_object(project_id, filepath, down_filename)
-        except ResponseError:
+            self._get_downloader(store_id).download_file(client, project_id, filepath, down_filename)
+        except Exception:
             logging.error("Error while trying to download. Error: %s", sys.exc_info()[1])
             raise ValidationError("Unable to download asset from remote storage.")
 
@@ -217,21 +575,19 @@ class S3Manager:
         client = self._get_connection(store_id)
         try:
             logging.debug('Checking if project meta exists...')
-            response = client.get_object(project_id, OVE_META)
-            return 200 <= response.status < 300
+            client.stat_object(project_id, OVE_META)
+            return True
         except:
             return False
 
-    def get_project_meta(self, project_id: str, store_id: str = None, ignore_errors: bool = False) -> Union[None, OveProjectMeta]:
+    def get_project_meta(self, project_id: str, store_id: str = None, ignore_errors: bool = False, use_cache: bool = True) -> Union[None, OveProjectMeta]:
         client = self._get_connection(store_id)
         try:
-            obj = _decode_json(client.get_object(project_id, PROJECT_FILE))['Metadata']
-            result = OveProjectMeta(**obj)
-            result.id = project_id
-
-            project_info = self.get_object_info(store_id=store_id, project_id=project_id, object_id="project")
-            result.url = project_info.get("index_file", "") if project_info else ""
-            return result
+            # project.json was just read, so there is no need to check it exists before computing the url
+            project = self._read_json(client=client, project_id=project_id, key=PROJECT_FILE, store_id=store_id, use_cache=use_cache)
+            if project is None:
+                raise InvalidProjectError(store_id=store_id, project_id=project_id)
+            return project_meta(project_id=project_id, metadata=project[PROJECT_METADATA_SECTION], proxy_url=self._get_proxy_url(store_id))
         except:
             if ignore_errors:
                 return OveProjectMeta(id=project_id, name=project_id)
@@ -242,10 +598,9 @@ class S3Manager:
     def set_project_meta(self, project_id: str, meta: OveProjectMeta, store_id: str = None, ignore_errors: bool = False) -> None:
         client = self._get_connection(store_id)
         try:
-            try:
-                project = _decode_json(client.get_object(project_id, PROJECT_FILE))
-            except NoSuchKey:
-                project = PROJECT_BASIC_TEMPLATE
+            project = self._read_json(client=client, project_id=project_id, key=PROJECT_FILE, store_id=store_id, use_cache=False)
+            if project is None:
+                project = copy.deepcopy(PROJECT_BASIC_TEMPLATE)
 
             if PROJECT_METADATA_SECTION not in project.keys():
                 project[PROJECT_METADATA_SECTION] = {}
@@ -253,26 +608,39 @@ class S3Manager:
             for field in OveProjectMeta.EDITABLE_FIELDS:
                 project[PROJECT_METADATA_SECTION][field] = getattr(meta, field, '')
 
-            data, size = _encode_json(project)
-            client.put_object(project_id, PROJECT_FILE, data, size)
+            self._write_json(client=client, project_id=project_id, key=PROJECT_FILE, data=project, store_id=store_id)
         except:
             if not ignore_errors:
                 logging.error("Error while trying to set project meta. Error: %s", sys.exc_info()[1])
                 raise InvalidProjectError(store_id=store_id, project_id=project_id)
+            return
+
+        self._touch_project(client=client, project_id=project_id)
 
     def get_project_access_meta(self, store_id: str, project_id: str) -> Union[None, OveProjectAccessMeta]:
+        cache_key = (self._cache_store(store_id), project_id)
+        groups = self._acl_cache.get(cache_key)
+        if groups is not None:
+            return OveProjectAccessMeta(groups=list(groups))
+
         client = self._get_connection(store_id)
+        generation = self._acl_cache.generation(cache_key)
         try:
             params = _decode_json(client.get_object(project_id, OVE_META))
-            return OveProjectAccessMeta(**params)
+            meta = OveProjectAccessMeta(**params)
+        except NoSuchKey:
+            meta = OveProjectAccessMeta()
         except:
+            # transient store errors are not cached, the next request will try again
             return OveProjectAccessMeta()
 
+        self._acl_cache.put(cache_key, list(meta.groups), generation=generation)
+        return meta
+
     def set_project_access_meta(self, store_id: str, project_id: str, meta: OveProjectAccessMeta) -> None:
         client = self._get_connection(store_id)
         try:
-            data, size = _encode_json(meta.to_json())
-            client.put_object(project_id, OVE_META, data, size)
+            self._write_json(client=client, project_id=project_id, key=OVE_META, data=meta.to_json(), store_id=store_id)
         except:
             logging.error("Error while trying to set project meta. Error: %s", sys.exc_info()[1])
 
@@ -284,24 +652,26 @@ class S3Manager:
             return False
 
         meta = self.get_project_access_meta(store_id=store_id, project_id=project_id)
-        return any(group in groups for group in meta.groups)
+        return has_group_access(project_groups=meta.groups, groups=groups, is_admin=is_admin)
 
     def has_asset_meta(self, project_id: str, asset_id: str, store_id: str = None) -> bool:
         client = self._get_connection(store_id)
         try:
             meta_name = asset_id + S3_SEPARATOR + OVE_META
             logging.debug('Checking if asset exists...')
-            response = client.get_object(project_id, meta_name)
-            return 200 <= response.status < 300
+            return self._exists_json(client=client, project_id=project_id, key=meta_name, store_id=store_id)
         except:
             return False
 
-    def get_asset_meta(self, project_id: str, asset_id: str, store_id: str = None, ignore_errors: bool = False) -> Union[None, OveAssetMeta]:
+    def get_asset_meta(self, project_id: str, asset_id: str, store_id: str = None, ignore_errors: bool = False,
+                       use_cache: bool = True) -> Union[None, OveAssetMeta]:
         client = self._get_connection(store_id)
         try:
             meta_name = asset_id + S3_SEPARATOR + OVE_META
             logging.debug('Checking if asset exists')
-            obj = _decode_json(client.get_object(project_id, meta_name))
+            obj = self._read_json(client=client, project_id=project_id, key=meta_name, store_id=store_id, use_cache=use_cache)
+            if obj is None:
+                raise InvalidAssetError(store_id=store_id, project_id=project_id, asset_id=asset_id)
             meta = OveAssetMeta(**obj)
             meta.id = asset_id
             return meta
@@ -316,45 +686,101 @@ class S3Manager:
         client = self._get_connection(store_id)
         try:
             meta_name = asset_id + S3_SEPARATOR + OVE_META
-            data, size = _encode_json(meta.to_json())
-            client.put_object(project_id, meta_name, data, size)
+            self._write_json(client=client, project_id=project_id, key=meta_name, data=meta.to_json(), store_id=store_id)
         except:
             if not ignore_errors:
                 logging.error("Error while trying to set asset meta. Error: %s", sys.exc_info()[1])
                 raise InvalidAssetError(store_id=store_id, project_id=project_id, asset_id=asset_id)
+            return
+
+        self._update_catalog(client=client, project_id=project_id, metas={asset_id: meta}, store_id=store_id)
+        self._touch_project(client=client, project_id=project_id)
+
+    # Saves the metadata of several assets, the .ovemeta files are written concurrently and the catalog and the project marker
+    # are updated once for all of them
+    # Returns the errors of the assets that could not be saved
+    def set_asset_metas(self, project_id: str, metas: Dict[str, OveAssetMeta], store_id: str = None) -> Dict[str, Exception]:
+        client = self._get_connection(store_id)
+
+        def _write(item: Tuple[str, OveAssetMeta]) -> Union[None, Exception]:
+            asset_id, meta = item
+            try:
+                self._write_json(client=client, project_id=project_id, key=asset_id + S3_SEPARATOR + OVE_META, data=meta.to_json(), store_id=store_id)
+                return None
+            except:
+                logging.error("Error while trying to set asset meta. Error: %s", sys.exc_info()[1])
+                return InvalidAssetError(store_id=store_id, project_id=project_id, asset_id=asset_id)
+
+        items = list(metas.items())
+        errors = {asset_id: error for (asset_id, _), error in zip(items, self._fan_out(_write, items, store_id=store_id)) if error is not None}
+        if errors:
+            # a failed write may still have replaced the .ovemeta, so the catalog cannot be trusted anymore
+            self._drop_catalog(client=client, project_id=project_id)
+        elif metas:
+            self._update_catalog(client=client, project_id=project_id, metas=metas, store_id=store_id)
+
+        if len(errors) < len(metas):
+            self._touch_project(client=client, project_id=project_id)
+        return errors
 
     def project_type(self, store_id: str, project_id: str) -> str:
-        project = self.get_object(store_id=store_id, project_id=project_id, object_id="project", ignore_errors=True)
-        if project:
-            meta = project.get(PROJECT_METADATA_SECTION, None)
-            if meta:
-                controller = meta.get("controller", None)
-                if controller:
-                    return "controller"
+        return get_project_type(self.get_object(store_id=store_id, project_id=project_id, object_id="project", ignore_errors=True))
 
-            sections = project.get(PROJECT_SECTIONS, [])
-            if len(sections) > 0:
-                return "launcher"
+    # Loads project.json and .ovemeta only once and derives all the project level information from them
+    def _load_project_descriptor(self, project_id: str, store_id: str = None) -> ProjectDescriptor:
+        project = self.get_object(store_id=store_id, project_id=project_id, object_id="project", ignore_errors=True)
+        access_meta = self.get_project_access_meta(store_id=store_id, project_id=project_id)
+        return ProjectDescriptor(project_id=project_id, project=project, access_meta=access_meta, proxy_url=self._get_proxy_url(store_id))
 
-        return "none"
+    def describe_project(self, project_id: str, access: UserAccessMeta, store_id: str = None) -> Dict:
+        return self._load_project_descriptor(store_id=store_id, project_id=project_id).to_public_json(access=access)
 
     def has_object(self, project_id: str, object_id: str, store_id: str = None) -> bool:
-        _validate_object_id(store_id=store_id, project_id=project_id, object_id=object_id)
+        validate_object_id(store_id=store_id, project_id=project_id, object_id=object_id)
 
         client = self._get_connection(store_id)
         try:
             logging.debug('Checking if object exists ...')
-            response = client.get_object(project_id, object_id + S3_OBJECT_EXTENSION)
-            return 200 <= response.status < 300
+            return self._exists_json(client=client, project_id=project_id, key=object_id + S3_OBJECT_EXTENSION, store_id=store_id)
         except:
             return False
 
+    # Checks which of the keys exist with one listing per distinct folder, instead of one request per key
+    def exists_many(self, project_id: str, keys: List[str], store_id: str = None) -> Set[str]:
+        client = self._get_connection(store_id)
+        folders = {}
+        for key in keys:
+            folders.setdefault(key[:key.rfind(S3_SEPARATOR) + 1], set()).add(key)
+
+        result = set()
+        for prefix, folder_keys in folders.items():
+            for a in client.list_objects(project_id, prefix=prefix or None, recursive=False):
+                if not a.is_dir and a.object_name in folder_keys:
+                    result.add(a.object_name)
+        return result
+
+    def has_objects(self, project_id: str, object_ids: List[str], store_id: str = None) -> List[str]:
+        for object_id in object_ids:
+            validate_object_id(store_id=store_id, project_id=project_id, object_id=object_id)
+
+        try:
+            existing = self.exists_many(store_id=store_id, project_id=project_id, keys=[object_id + S3_OBJECT_EXTENSION for object_id in object_ids])
+            return [object_id for object_id in object_ids if object_id + S3_OBJECT_EXTENSION in existing]
+        except InvalidStoreError:
+            raise
+        except:
+            logging.error("Error while trying to check objects. Error: %s", sys.exc_info()[1])
+            return []
+
     def get_object(self, project_id: str, object_id: str, store_id: str = None, ignore_errors: bool = False) -> Union[None, Dict]:
-        _validate_object_id(store_id=store_id, project_id=project_id, object_id=object_id)
+        validate_object_id(store_id=store_id, project_id=project_id, object_id=object_id)
 
         client = self._get_connection(store_id)
         try:
-            return _decode_json(client.get_object(project_id, object_id + S3_OBJECT_EXTENSION))
+            data = self._read_json(client=client, project_id=project_id, key=object_id + S3_OBJECT_EXTENSION, store_id=store_id)
+            if data is None:
+                raise InvalidObjectError(store_id=store_id, project_id=project_id, object_id=object_id)
+            return data
         except Exception:
             if ignore_errors:
                 return None
@@ -364,24 +790,32 @@ class S3Manager:
 
     def get_object_info(self, project_id: str, object_id: str, store_id: str = None) -> Union[None, Dict]:
         if self.has_object(store_id=store_id, project_id=project_id, object_id=object_id):
-            return {
-                "name": object_id,
-                "index_file": append_slash(self._get_proxy_url(store_id=store_id)) + project_id + "/" + object_id + S3_OBJECT_EXTENSION
-            }
+            return self._object_info(project_id=project_id, object_id=object_id, store_id=store_id)
         else:
             return None
 
+    def get_objects_info(self, project_id: str, object_ids: List[str], store_id: str = None) -> List[Dict]:
+        return [self._object_info(project_id=project_id, object_id=object_id, store_id=store_id)
+                for object_id in self.has_objects(store_id=store_id, project_id=project_id, object_ids=object_ids)]
+
+    def _object_info(self, project_id: str, object_id: str, store_id: str = None) -> Dict:
+        return {
+            "name": object_id,
+            "index_file": append_slash(self._get_proxy_url(store_id=store_id)) + project_id + "/" + object_id + S3_OBJECT_EXTENSION
+        }
+
     def set_object(self, project_id: str, object_id: str, object_data: Dict, store_id: str = None) -> None:
-        _validate_object_id(store_id=store_id, project_id=project_id, object_id=object_id)
+        validate_object_id(store_id=store_id, project_id=project_id, object_id=object_id)
 
         client = self._get_connection(store_id)
         try:
-            data, size = _encode_json(object_data)
-            client.put_object(project_id, object_id + S3_OBJECT_EXTENSION, data, size)
+            self._write_json(client=client, project_id=project_id, key=object_id + S3_OBJECT_EXTENSION, data=object_data, store_id=store_id)
         except Exception:
             logging.error("Error while trying to set object. Error: %s", sys.exc_info()[1])
             raise InvalidObjectError(store_id=store_id, project_id=project_id, object_id=object_id)
 
+        self._touch_project(client=client, project_id=project_id)
+
     def get_stream(self, store_id: str, project_id: str, path_name: str) -> io.FileIO:
         client = self._get_connection(store_id)
         try:
@@ -400,10 +834,87 @@ class S3Manager:
             raise StreamNotFoundError(store_id=store_id, project_id=project_id, filename=path_name)
 
 
+class _ClientCache:
+    """
+    Reuses the clients (and their connection pools) of the stores used recently, keyed by the store connection settings.
+    Clients not used for `idle_timeout` seconds, or the least recently used ones above `max_size`, are closed.
+    """
+
+    def __init__(self, client_factory: Callable[[Dict], Minio], max_size: int, idle_timeout: float):
+        self.client_factory = client_factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, store_config: Dict) -> Minio:
+        # the secret key and the http settings are part of the key, so updated credentials get a new client
+        key = (store_config.get(CONFIG_ENDPOINT, ""), store_config.get(CONFIG_ACCESS_KEY, ""), store_config.get(CONFIG_SECRET_KEY, ""),
+               json.dumps(store_config.get(CONFIG_HTTP_CLIENT, {}) or {}, sort_keys=True))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._clients.pop(key, None)
+            client = entry[1] if entry is not None else self.client_factory(store_config)
+            self._clients[key] = (now, client)
+
+            # the entries are ordered by last use, so the idle and the least recently used clients are at the front
+            while len(self._clients) > 1:
+                last_used, evicted = next(iter(self._clients.values()))
+                if len(self._clients) <= self.max_size and now - last_used <= self.idle_timeout:
+                    break
+                self._clients.popitem(last=False)
+                if hasattr(evicted, "_http"):
+                    evicted._http.clear()
+            return client
+
+
 # Helpers
-def _validate_object_id(store_id: str, project_id: str, object_id: str) -> None:
-    if not (object_id and object_id.isalnum()):
-        raise InvalidObjectError(store_id=store_id, project_id=project_id, object_id=object_id)
+def _create_client(client_config: Dict) -> Minio:
+    http_config = client_config.get(CONFIG_HTTP_CLIENT, {}) or {}
+    retries = http_config.get(CONFIG_HTTP_RETRIES, _DEFAULT_HTTP_RETRIES)
+    # the pool should be at least as large as the number of threads using the store at the same time, or the extra connections
+    # are closed after every request
+    http_client = PoolManager(maxsize=http_config.get(CONFIG_HTTP_POOL_SIZE, _DEFAULT_HTTP_POOL_SIZE),
+                              timeout=Timeout(connect=http_config.get(CONFIG_HTTP_CONNECT_TIMEOUT, _DEFAULT_HTTP_CONNECT_TIMEOUT),
+                                              read=http_config.get(CONFIG_HTTP_READ_TIMEOUT, _DEFAULT_HTTP_READ_TIMEOUT)),
+                              retries=Retry(total=retries, backoff_factor=http_config.get(CONFIG_HTTP_BACKOFF, _DEFAULT_HTTP_BACKOFF),
+                                            status_forcelist=[500, 502, 503, 504]))
+    return Minio(endpoint=client_config.get(CONFIG_ENDPOINT, ""),
+                 access_key=client_config.get(CONFIG_ACCESS_KEY, ""),
+                 secret_key=client_config.get(CONFIG_SECRET_KEY, ""),
+                 secure=False,
+                 http_client=http_client)
+
+
+def _pool_stats(client: Minio) -> Dict:
+    client = client.wrapped if isinstance(client, InstrumentedClient) else client
+    if not hasattr(client, "_http"):
+        # in-memory clients have no connection pool, their call counters are reported instead
+        return {"calls": client.stats()}
+
+    pools = [client._http.pools[key] for key in client._http.pools.keys()]
+    return {
+        "maxPoolSize": client._http.connection_pool_kw.get("maxsize", 1),
+        "pools": len(pools),
+        "connectionsCreated": sum(pool.num_connections for pool in pools),
+        "requests": sum(pool.num_requests for pool in pools),
+        # connections returned to the pool and ready to be reused
+        "idle": sum(len([c for c in list(pool.pool.queue) if c is not None]) for pool in pools if pool.pool is not None),
+    }
+
+
+def _catalog_meta(asset_id: str, data: Dict) -> OveAssetMeta:
+    meta = OveAssetMeta(**data)
+    meta.id = asset_id
+    return meta
+
+
+# project.json, the project .ovemeta, the objects and the asset .ovemeta files
+def _is_cached_key(key: str) -> bool:
+    parts = key.split(S3_SEPARATOR)
+    if len(parts) == 1:
+        return key == OVE_META or key.endswith(S3_OBJECT_EXTENSION)
+    return len(parts) == 2 and parts[1] == OVE_META
 
 
 def _encode_json(data: Any) -> Tuple[io.BytesIO, int]:
@@ -413,4 +924,14 @@ def _encode_json(data: Any) -> Tuple[io.BytesIO, int]:
 
 
 def _decode_json(response: HTTPResponse) -> Dict:
-    return json.load(io.TextIOWrapper(response, encoding=_DEFAULT_OBJECT_ENCODING))
+    try:
+        data = response.read()
+    except:
+        # the rest of the body is unknown, so the connection cannot be reused
+        response.close()
+        response.release_conn()
+        raise
+
+    # the body was read entirely, so the connection goes back to the pool and is kept alive
+    response.release_conn()
+    return json.loads(data.decode(_DEFAULT_OBJECT_ENCODING))
@@ -0,0 +1,199 @@
+# Parallel transfer helpers for large objects
+# The multipart calls rely on the internal api of the pinned minio client (see requirements.*.txt)
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from typing import Any, Callable
+
+from minio import Minio
+from minio.definitions import UploadPart
+
+from common.storecalls import propagate
+
+# s3 limits for multipart uploads
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+_DEFAULT_CONTENT_TYPE = "application/octet-stream"
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class MultipartUploader:
+    """
+    Uploads large objects as multipart uploads, sending up to `concurrency` parts at the same time.
+    Each part is retried individually and the upload is aborted on the store if any part fails, so no orphan parts are left behind.
+    Objects smaller than one part are uploaded with a single request.
+    """
+
+    def __init__(self, part_size: int, concurrency: int = 4, retries: int = 3, backoff: float = 0.5):
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.concurrency = max(concurrency, 1)
+        self.retries = max(retries, 0)
+        self.backoff = backoff
+
+    def upload_file(self, client: Minio, bucket_name: str, object_name: str, filename: str) -> None:
+        length = os.stat(filename).st_size
+        if length <= self.part_size:
+            client.fput_object(bucket_name, object_name, filename)
+            return
+
+        # every part reads its own slice of the file, so the parts do not share any buffer
+        fd = os.open(filename, os.O_RDONLY)
+        try:
+            part_size = self._part_size(length)
+
+            def _read(part_number: int) -> bytes:
+                offset = (part_number - 1) * part_size
+                return os.pread(fd, min(part_size, length - offset), offset)
+
+            self._upload(client=client, bucket_name=bucket_name, object_name=object_name, length=length, part_size=part_size, read_fn=_read)
+        finally:
+            os.close(fd)
+
+    def upload_stream(self, client: Minio, bucket_name: str, object_name: str, stream: Any, length: int) -> None:
+        if length <= self.part_size:
+            client.put_object(bucket_name, object_name, stream, length)
+            return
+
+        # the stream can only be read sequentially, the parts are buffered in memory but at most
+        # `concurrency` parts are in flight at any time, so the memory usage is bounded
+        part_size = self._part_size(length)
+
+        def _read(part_number: int) -> bytes:
+            return _read_full(stream, min(part_size, length - (part_number - 1) * part_size))
+
+        self._upload(client=client, bucket_name=bucket_name, object_name=object_name, length=length, part_size=part_size, read_fn=_read,
+                     sequential=True)
+
+    def _part_size(self, length: int) -> int:
+        return max(self.part_size, -(-length // MAX_PARTS))
+
+    def _upload(self, client: Minio, bucket_name: str, object_name: str, length: int, part_size: int, read_fn: Callable[[int], bytes],
+                sequential: bool = False) -> None:
+        parts_count = -(-length // part_size)
+        upload_id = client._new_multipart_upload(bucket_name, object_name, {"Content-Type": _DEFAULT_CONTENT_TYPE})
+        uploaded_parts = {}
+
+        @propagate
+        def _upload_part(part_number: int, data: bytes = None) -> None:
+            if data is None:
+                data = read_fn(part_number)
+            etag = retry(lambda: client._do_put_object(bucket_name, object_name, data, len(data), upload_id=upload_id, part_number=part_number),
+                         retries=self.retries, backoff=self.backoff, description="{}/{} part {}".format(bucket_name, object_name, part_number))
+            uploaded_parts[part_number] = UploadPart(bucket_name, object_name, upload_id, part_number, etag, None, len(data))
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="s3-upload") as executor:
+                if sequential:
+                    slots = threading.BoundedSemaphore(self.concurrency)
+                    futures = []
+                    for part_number in range(1, parts_count + 1):
+                        slots.acquire()
+                        if any(f.done() and f.exception() for f in futures):
+                            slots.release()
+                            break
+                        data = read_fn(part_number)
+                        future = executor.submit(_upload_part, part_number, data)
+                        future.add_done_callback(lambda _: slots.release())
+                        futures.append(future)
+                else:
+                    futures = [executor.submit(_upload_part, part_number) for part_number in range(1, parts_count + 1)]
+
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                for future in futures:
+                    future.cancel()
+                for future in done:
+                    if future.exception():
+                        raise future.exception()
+
+            if len(uploaded_parts) != parts_count:
+                raise IOError("Uploaded {} parts out of {} for {}/{}".format(len(uploaded_parts), parts_count, bucket_name, object_name))
+
+            client._complete_multipart_upload(bucket_name, object_name, upload_id, uploaded_parts)
+        except BaseException:
+            logging.error("Aborting the multipart upload of %s/%s ...", bucket_name, object_name)
+            try:
+                client._remove_incomplete_upload(bucket_name, object_name, upload_id)
+            except Exception as ex:
+                logging.error("Error while trying to abort the multipart upload of %s/%s. Error: %s", bucket_name, object_name, ex)
+            raise
+
+
+class RangedDownloader:
+    """
+    Downloads large objects over several connections: the object is split into byte ranges that are fetched concurrently
+    and written at their offset in a preallocated file. Objects smaller than `threshold` are downloaded with a single request.
+    """
+
+    def __init__(self, range_size: int, concurrency: int = 4, threshold: int = 64 * 1024 * 1024, retries: int = 3, backoff: float = 0.5):
+        self.range_size = max(range_size, 1)
+        self.concurrency = max(concurrency, 1)
+        self.threshold = threshold
+        self.retries = max(retries, 0)
+        self.backoff = backoff
+
+    def download_file(self, client: Minio, bucket_name: str, object_name: str, filename: str) -> None:
+        length = client.stat_object(bucket_name, object_name).size
+        if self.concurrency <= 1 or length < self.threshold:
+            client.fget_object(bucket_name, object_name, filename)
+            return
+
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, length)
+
+            @propagate
+            def _download_range(offset: int) -> None:
+                size = min(self.range_size, length - offset)
+                retry(lambda: _copy_range(client, bucket_name, object_name, fd, offset, size), retries=self.retries, backoff=self.backoff,
+                      description="{}/{} range {}-{}".format(bucket_name, object_name, offset, offset + size - 1))
+
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="s3-download") as executor:
+                futures = [executor.submit(_download_range, offset) for offset in range(0, length, self.range_size)]
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                for future in futures:
+                    future.cancel()
+                for future in done:
+                    if future.exception():
+                        raise future.exception()
+        finally:
+            os.close(fd)
+
+
+def _copy_range(client: Minio, bucket_name: str, object_name: str, fd: int, offset: int, size: int) -> None:
+    response = client.get_partial_object(bucket_name, object_name, offset, size)
+    try:
+        written = 0
+        for chunk in response.stream(_COPY_BUFFER_SIZE):
+            written += os.pwrite(fd, chunk, offset + written)
+        if written != size:
+            raise IOError("Received {} bytes out of {} for {}/{} at offset {}".format(written, size, bucket_name, object_name, offset))
+    finally:
+        response.release_conn()
+
+
+def retry(fn: Callable, retries: int, backoff: float, description: str) -> Any:
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as ex:
+            if attempt >= retries:
+                raise
+            attempt += 1
+            logging.warning("Retrying %s (%s/%s). Error: %s", description, attempt, retries, ex)
+            time.sleep(backoff * (2 ** (attempt - 1)))
+
+
+def _read_full(stream: Any, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            raise IOError("Unexpected end of stream, {} bytes missing".format(remaining))
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
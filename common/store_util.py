@@ -0,0 +1,105 @@
+# Helpers shared by the store backends (common.s3minio and common.fsmanager)
+import base64
+import datetime
+from typing import Dict, List, Union
+
+from common.consts import PROJECT_FILE, PROJECT_METADATA_SECTION, PROJECT_SECTIONS
+from common.entities import OveProjectMeta, OveProjectAccessMeta, UserAccessMeta
+from common.errors import ValidationError, InvalidObjectError
+from common.util import append_slash
+
+_DEFAULT_OBJECT_ENCODING = "utf-8"
+
+
+class ProjectDescriptor:
+    """
+    Project level information derived from project.json and the project .ovemeta, read only once.
+    """
+
+    def __init__(self, project_id: str, project: Union[None, Dict], access_meta: OveProjectAccessMeta, proxy_url: str):
+        self.project_id = project_id
+        self.project = project
+        self.access_meta = access_meta
+
+        try:
+            metadata = project.get(PROJECT_METADATA_SECTION, None) if project else None
+            self.meta = project_meta(project_id=project_id, metadata=metadata, proxy_url=proxy_url) if metadata is not None else None
+        except:
+            self.meta = None
+
+        if self.meta is None:
+            self.meta = OveProjectMeta(id=project_id, name=project_id)
+
+    @property
+    def has_project(self) -> bool:
+        return self.project is not None
+
+    def has_access(self, groups: List[str], is_admin: bool) -> bool:
+        return has_group_access(project_groups=self.access_meta.groups, groups=groups, is_admin=is_admin)
+
+    def to_public_json(self, access: UserAccessMeta) -> Dict:
+        item = self.meta.to_public_json()
+        item["id"] = self.project_id
+        item["hasProject"] = self.has_project
+        item["projectType"] = get_project_type(self.project)
+        item["access"] = self.access_meta.groups
+        item["read_access"] = True
+        item["write_access"] = self.has_access(groups=access.write_groups, is_admin=access.admin_access)
+        return item
+
+
+def format_date(date: datetime.datetime) -> str:
+    return '{0:%Y-%m-%d %H:%M:%S}'.format(date)
+
+
+def project_meta(project_id: str, metadata: Dict, proxy_url: str) -> OveProjectMeta:
+    result = OveProjectMeta(**metadata)
+    result.id = project_id
+    result.url = append_slash(proxy_url) + project_id + "/" + PROJECT_FILE
+    return result
+
+
+def has_group_access(project_groups: List[str], groups: List[str], is_admin: bool) -> bool:
+    if is_admin:
+        return True
+
+    if groups is None or len(groups) == 0:
+        return False
+
+    return any(group in groups for group in project_groups)
+
+
+def get_project_type(project: Union[None, Dict]) -> str:
+    if project:
+        meta = project.get(PROJECT_METADATA_SECTION, None)
+        if meta:
+            controller = meta.get("controller", None)
+            if controller:
+                return "controller"
+
+        sections = project.get(PROJECT_SECTIONS, [])
+        if len(sections) > 0:
+            return "launcher"
+
+    return "none"
+
+
+def encode_cursor(object_name: str) -> str:
+    return base64.urlsafe_b64encode(object_name.encode(_DEFAULT_OBJECT_ENCODING)).decode("ascii")
+
+
+def decode_cursor(cursor: str, prefix: str) -> str:
+    try:
+        object_name = base64.urlsafe_b64decode(cursor.encode("ascii")).decode(_DEFAULT_OBJECT_ENCODING)
+    except:
+        object_name = None
+
+    # a cursor is only valid for the listing that produced it
+    if not object_name or not object_name.startswith(prefix):
+        raise ValidationError(title="Invalid cursor", description="The cursor provided does not belong to this file list")
+    return object_name
+
+
+def validate_object_id(store_id: str, project_id: str, object_id: str) -> None:
+    if not (object_id and object_id.isalnum()):
+        raise InvalidObjectError(store_id=store_id, project_id=project_id, object_id=object_id)
@@ -0,0 +1,169 @@
+# Instrumentation of the store client calls
+# Every call is counted (with the bytes transferred and the time spent) in the process totals and, if a recording is active
+# on the current thread (i.e. during an API request), in the totals of the request
+import functools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Union
+
+from common.metrics import Histogram
+
+# calls returning a lazy listing, the time is measured while the listing is consumed
+_LISTING_OPERATIONS = {"list_buckets", "list_objects", "list_objects_v2"}
+
+_local = threading.local()
+
+
+class StoreCallStats:
+    """
+    Thread-safe counters of calls, errors, bytes and seconds by operation.
+    If a `latency` histogram is provided, the duration of every call is observed by operation as well.
+    """
+
+    def __init__(self, latency: Histogram = None):
+        self.latency = latency
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def add(self, operation: str, seconds: float, size: int = 0, error: bool = False) -> None:
+        with self._lock:
+            counters = self._operations.get(operation, None)
+            if counters is None:
+                counters = self._operations[operation] = {"calls": 0, "errors": 0, "bytes": 0, "seconds": 0.0}
+            counters["calls"] += 1
+            counters["errors"] += 1 if error else 0
+            counters["bytes"] += size
+            counters["seconds"] += seconds
+        if self.latency is not None:
+            self.latency.observe((operation,), seconds)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {operation: dict(counters) for operation, counters in self._operations.items()}
+
+    def totals(self) -> Dict:
+        operations = self.snapshot().values()
+        return {"calls": sum(c["calls"] for c in operations), "errors": sum(c["errors"] for c in operations),
+                "bytes": sum(c["bytes"] for c in operations), "seconds": sum(c["seconds"] for c in operations)}
+
+    def summary(self) -> str:
+        totals = self.totals()
+        operations = ", ".join("{}={}".format(operation, counters["calls"]) for operation, counters in sorted(self.snapshot().items()))
+        return "{} calls; {} bytes; {:.1f} ms{}".format(totals["calls"], totals["bytes"], totals["seconds"] * 1000,
+                                                        "; " + operations if operations else "")
+
+
+def start_recording() -> StoreCallStats:
+    _local.recording = StoreCallStats()
+    return _local.recording
+
+
+def stop_recording() -> Union[StoreCallStats, None]:
+    recording = getattr(_local, "recording", None)
+    _local.recording = None
+    return recording
+
+
+def propagate(fn: Callable) -> Callable:
+    """
+    Binds fn to the recording of the calling thread, so the calls it makes from a thread pool are counted in the same request.
+    """
+    recording = getattr(_local, "recording", None)
+    if recording is None:
+        return fn
+
+    @functools.wraps(fn)
+    def _wrapper(*args, **kwargs):
+        previous = getattr(_local, "recording", None)
+        _local.recording = recording
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.recording = previous
+
+    return _wrapper
+
+
+class InstrumentedClient:
+    """
+    Wraps a store client, recording every method call in `stats` and in the recording of the current thread.
+    """
+
+    def __init__(self, client: Any, stats: StoreCallStats):
+        self._client = client
+        self._stats = stats
+
+    @property
+    def wrapped(self) -> Any:
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("__"):
+            return attr
+
+        operation = name.lstrip("_")
+
+        def _call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except BaseException:
+                self._record(operation, start=start, error=True)
+                raise
+
+            if operation in _LISTING_OPERATIONS and not isinstance(result, list):
+                return self._timed_listing(operation, result, elapsed=time.perf_counter() - start)
+
+            self._record(operation, start=start, size=_transferred(operation, args, kwargs, result))
+            return result
+
+        return _call
+
+    def _timed_listing(self, operation: str, listing: Iterator, elapsed: float) -> Iterator:
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(listing)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        except GeneratorExit:
+            # the caller stopped reading the listing early
+            self._add(operation, seconds=elapsed)
+            raise
+        except BaseException:
+            self._add(operation, seconds=elapsed, error=True)
+            raise
+        self._add(operation, seconds=elapsed)
+
+    def _record(self, operation: str, start: float, size: int = 0, error: bool = False) -> None:
+        self._add(operation, seconds=time.perf_counter() - start, size=size, error=error)
+
+    def _add(self, operation: str, seconds: float, size: int = 0, error: bool = False) -> None:
+        self._stats.add(operation, seconds=seconds, size=size, error=error)
+        recording = getattr(_local, "recording", None)
+        if recording is not None:
+            recording.add(operation, seconds=seconds, size=size, error=error)
+
+
+def _transferred(operation: str, args: tuple, kwargs: Dict, result: Any) -> int:
+    try:
+        if operation == "put_object":
+            return int(kwargs.get("length", args[3] if len(args) > 3 else 0))
+        if operation == "do_put_object":
+            return len(kwargs.get("part_data", args[2] if len(args) > 2 else b""))
+        if operation == "fput_object":
+            return os.path.getsize(kwargs.get("file_path", args[2] if len(args) > 2 else ""))
+        if operation in {"get_object", "get_partial_object"}:
+            headers = getattr(result, "headers", None)
+            return int(headers.get("content-length", 0)) if headers is not None else len(result.getbuffer())
+        if operation == "fget_object":
+            return int(getattr(result, "size", 0) or 0)
+    except Exception:
+        pass
+    return 0
@@ -22,6 +22,7 @@ cd "${scriptPath}/" || exit 1
 [[ ! -z "${SERVICE_CONFIG}" ]] || SERVICE_CONFIG="config/credentials.json"
 [[ ! -z "${AUTH_CONFIG}" ]] || AUTH_CONFIG="config/auth.json"
 [[ ! -z "${WORKER_CONFIG}" ]] || WORKER_CONFIG="config/worker.json"
+[[ ! -z "${STORE_TYPE}" ]] || STORE_TYPE="s3"
 
 echo "Environment variables:"
 echo "  GUNICORN_PORT=${GUNICORN_PORT}"
@@ -33,9 +34,10 @@ echo "  SERVICE_LOG_LEVEL=${SERVICE_LOG_LEVEL}"
 echo "  SERVICE_CONFIG=${SERVICE_CONFIG}"
 echo "  AUTH_CONFIG=${AUTH_CONFIG}"
 echo "  WORKER_CONFIG=${WORKER_CONFIG}"
+echo "  STORE_TYPE=${STORE_TYPE}"
 echo ""
 
 ## did you activate the virtual environment and install the requirements?
 exec gunicorn --bind "${GUNICORN_HOST}:${GUNICORN_PORT}" --workers ${GUNICORN_WORKERS} --threads ${GUNICORN_THREADS} \
   --timeout ${GUNICORN_TIMEOUT} \
-  "am:setup_app(credentials_config='${SERVICE_CONFIG}', auth_config='${AUTH_CONFIG}', worker_config='${WORKER_CONFIG}', logging_level='${SERVICE_LOG_LEVEL}')"
+  "am:setup_app(credentials_config='${SERVICE_CONFIG}', auth_config='${AUTH_CONFIG}', worker_config='${WORKER_CONFIG}', store_type='${STORE_TYPE}', logging_level='${SERVICE_LOG_LEVEL}')"
@@ -62,6 +62,7 @@ done
 [[ ! -z "${WORKER_NAME}" ]] || WORKER_NAME=$(echo $(cat /dev/urandom | base64 | tr -dc "[:alnum:]" | head -c10))
 
 [[ ! -z "${WORKER_CONFIG}" ]] || WORKER_CONFIG="config/worker.json"
+[[ ! -z "${STORE_TYPE}" ]] || STORE_TYPE="s3"
 
 # For testing purpose this can be used, otherwise the next line should be commented
 # [[ ! -z "${WORKER_CLASS}" ]] || WORKER_CLASS="workers.dzi.DeepZoomImageWorker"
@@ -77,8 +78,9 @@ echo "  WORKER_NAME=${WORKER_NAME}"
 echo "  WORKER_CLASS=${WORKER_CLASS}"
 echo ""
 echo "  WORKER_CONFIG=${WORKER_CONFIG}"
+echo "  STORE_TYPE=${STORE_TYPE}"
 echo ""
 
 ## did you activate the virtual environment and install the requirements?
 exec gunicorn --bind "${GUNICORN_HOST}:${GUNICORN_PORT}" --workers ${GUNICORN_WORKERS} --threads ${GUNICORN_THREADS} --timeout ${GUNICORN_TIMEOUT} \
-  "workers.base:setup_worker(logging_level='${SERVICE_LOG_LEVEL}', worker_name='${WORKER_NAME}', worker_class='${WORKER_CLASS}', config_file='${WORKER_CONFIG}')"
+  "workers.base:setup_worker(logging_level='${SERVICE_LOG_LEVEL}', worker_name='${WORKER_NAME}', worker_class='${WORKER_CLASS}', config_file='${WORKER_CONFIG}', store_type='${STORE_TYPE}')"
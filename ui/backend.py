@@ -1,3 +1,4 @@
+import copy
 import json
 import urllib
 from typing import Dict, Any, List, Union
@@ -6,22 +7,46 @@ import falcon
 import urllib3
 from urllib3 import HTTPResponse
 
+from common.cache import TTLCache
 from common.consts import FIELD_AUTH_TOKEN
 from common.util import append_slash
 
+_VALIDATOR_CACHE_SIZE = 512
+_VALIDATOR_CACHE_TTL = 600
+
 
 class BackendClient:
     def __init__(self, backend_url: str, launcher_url: str):
         self.backend_url = append_slash(backend_url)
         self.launcher_url = launcher_url
         self._http = urllib3.PoolManager(headers={"Content-Type": "application/json", "Keep-Alive": "timeout=5, max=1000"})
+        # url -> (etag, result) of the GET responses with an ETag, the next requests only download the result if it changed
+        self._validators = TTLCache(max_size=_VALIDATOR_CACHE_SIZE, ttl=_VALIDATOR_CACHE_TTL)
 
     def head(self, api_url: str, auth_token: Union[str, None], headers: Dict = None) -> bool:
         response = self._http.request(method="HEAD", url=self.backend_url + api_url, headers=_fix_headers(auth_token=auth_token, headers=headers))
         return 200 <= response.status < 300
 
     def get(self, api_url: str, auth_token: Union[str, None], params: Dict = None, headers: Dict = None) -> Union[Dict, List, None]:
-        return self.request(method="GET", api_url=api_url, params=params, headers=headers, auth_token=auth_token)
+        url = _url(self.backend_url, api_url, params)
+        headers = _fix_headers(auth_token=auth_token, headers=headers)
+
+        # the access is still checked by the backend before answering 304 Not Modified
+        cached = self._validators.get(url, None)
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+
+        response = self._http.request(method="GET", url=url, timeout=60.0, headers=headers)
+        if response.status == 304 and cached is not None:
+            return copy.deepcopy(cached[1])
+
+        result = _process_response(api_url=api_url, response=response)
+        etag = response.headers.get("ETag", None)
+        if etag:
+            self._validators.put(url, (etag, copy.deepcopy(result)))
+        else:
+            self._validators.invalidate(url)
+        return result
 
     def post(self, api_url: str, auth_token: Union[str, None], data: Dict = None, params: Dict = None, headers: Dict = None) -> Union[Dict, List, None]:
         return self.request(method="POST", api_url=api_url, data=data, params=params, headers=headers, auth_token=auth_token)
@@ -5,6 +5,7 @@ from typing import Dict, List, Any, Union
 from ui.backend import BackendClient
 
 _RESERVED_NAMES = {"list", "validate", "create"}
+_FILES_PAGE_SIZE = 1000
 
 
 class BackendController:
@@ -84,11 +85,17 @@ class BackendController:
         return [_mutate(d, "short_index", basename(d.get("index_file", ""))) for d in self._backend.get("api/{}/{}/list".format(store_id, project_id), auth_token=auth_token)]
 
     def list_files(self, store_id: str, project_id: str, asset_id: str, auth_token: Union[str, None], hierarchical: bool = False, version: str = None) -> List[Dict]:
-        params = {}
+        params = {"limit": _FILES_PAGE_SIZE}
         if version:
             params["version"] = version
 
-        files = self._backend.get("api/{}/{}/files/{}".format(store_id, project_id, asset_id), params=params, auth_token=auth_token)
+        files = []
+        while True:
+            page = self._backend.get("api/{}/{}/files/{}".format(store_id, project_id, asset_id), params=params, auth_token=auth_token) or {}
+            files.extend(page.get("items", []))
+            if not page.get("nextCursor", None):
+                break
+            params["cursor"] = page.get("nextCursor")
 
         if hierarchical:
             file_tree = []
@@ -119,8 +126,7 @@ class BackendController:
         self._backend.post("api/workers/queue", data=data, auth_token=auth_token)
 
     def check_objects(self, store_id: str, project_id: str, object_ids: List[str], auth_token: Union[str, None]) -> List[Dict]:
-        return [self.get_object_info(store_id=store_id, project_id=project_id, object_id=item, auth_token=auth_token)
-                for item in object_ids if self.has_object(store_id=store_id, project_id=project_id, object_id=item, auth_token=auth_token)]
+        return self._backend.get("api/{}/{}/objects".format(store_id, project_id), params={"ids": ",".join(object_ids)}, auth_token=auth_token) or []
 
     def has_object(self, store_id: str, project_id: str, object_id: str, auth_token: Union[str, None]) -> bool:
         return self._backend.head("api/{}/{}/object/{}".format(store_id, project_id, object_id), auth_token=auth_token)
@@ -18,11 +18,12 @@ def setup_worker(**kwargs) -> falcon.API:
     worker_name = kwargs.get("worker_name", "test")
     worker_class = kwargs.get("worker_class", None)
     config_file = kwargs.get("config_file", DEFAULT_WORKER_CONFIG)
+    store_type = kwargs.get("store_type", "s3")
 
     logging.basicConfig(level=logging_level, format='[%(asctime)s] [%(levelname)s] %(message)s')
     signal.signal(signal.SIGCHLD, signal.SIG_IGN)
 
-    _worker = dynamic_import(worker_class)(name=worker_name, config_file=config_file, file_controller=FileController())
+    _worker = dynamic_import(worker_class)(name=worker_name, config_file=config_file, file_controller=FileController(store_type=store_type))
 
     app = falcon.API(middleware=[RequireJSON(), CORSComponent()])
     app.add_route('/api/worker/status', WorkerStatusRoute(worker=_worker))
@@ -1,9 +1,11 @@
 import glob
+import logging
 import os
-from typing import Dict
+from typing import Dict, Callable
 
 from common.entities import OveAssetMeta, TaskStatus
-from common.errors import WorkerLockError
+from common.errors import WorkerLockError, ValidationError
+from common.fsmanager import FSManager
 from common.s3minio import S3Manager
 from common.util import append_slash
 
@@ -12,6 +14,8 @@ class FileController:
     def __init__(self, store_type: str = "s3"):
         if store_type == "s3":
             self._manager = S3Manager()
+        elif store_type == "fs":
+            self._manager = FSManager()
         else:
             raise ValueError("Invalid store type provided")
 
@@ -21,8 +25,12 @@ class FileController:
     def clean(self):
         return self._manager.clear()
 
+    def set_invalidation_publisher(self, publisher: Callable[[str, str, str], None]) -> None:
+        self._manager.set_invalidation_publisher(publisher)
+
+    # the workers update the asset they read, so the meta is never taken from the cache
     def get_asset_meta(self, project_id: str, asset_id: str) -> OveAssetMeta:
-        return self._manager.get_asset_meta(project_id=project_id, asset_id=asset_id)
+        return self._manager.get_asset_meta(project_id=project_id, asset_id=asset_id, use_cache=False)
 
     def set_asset_meta(self, project_id: str, asset_id: str, meta: OveAssetMeta) -> None:
         self._manager.set_asset_meta(project_id=project_id, asset_id=asset_id, meta=meta)
@@ -33,14 +41,20 @@ class FileController:
     def upload_asset(self, project_id: str, asset_id: str, filename: str, upload_filename: str) -> None:
         return self._manager.upload_asset(project_id=project_id, asset_id=asset_id, filename=filename, upload_filename=upload_filename)
 
-    def upload_asset_folder(self, project_id: str, meta: OveAssetMeta, worker_name: str, upload_folder: str) -> None:
+    def upload_asset_folder(self, project_id: str, meta: OveAssetMeta, worker_name: str, upload_folder: str,
+                            progress: Callable[[int, int], None] = None) -> None:
         meta_filename_name = os.path.splitext(os.path.basename(meta.filename))[0]
         prefix = str(meta.version) + "/" + worker_name + "/" + meta_filename_name
-        for filename in glob.iglob(append_slash(upload_folder) + '**/*', recursive=True):
-            if not os.path.islink(filename) and not os.path.ismount(filename) and os.path.isfile(filename):
-                # note: filename[len(upload_folder):] always starts with /
-                self._manager.upload_asset(project_id=project_id, asset_id=meta.id, upload_filename=filename,
-                                           filename=prefix + filename[len(upload_folder):])
+        # note: filename[len(upload_folder):] always starts with /
+        uploads = [(prefix + filename[len(upload_folder):], filename) for filename in glob.iglob(append_slash(upload_folder) + '**/*', recursive=True)
+                   if not os.path.islink(filename) and not os.path.ismount(filename) and os.path.isfile(filename)]
+
+        logging.info("Uploading %s files into %s/%s ...", len(uploads), project_id, meta.id)
+        failures = self._manager.upload_assets(project_id=project_id, asset_id=meta.id, uploads=uploads, progress=progress or _log_progress)
+        if failures:
+            logging.error("Failed to upload %s out of %s files into %s/%s: %s", len(failures), len(uploads), project_id, meta.id, failures)
+            sample = ", ".join(sorted(failures.keys())[:5])
+            raise ValidationError(title="Upload failed", description="Unable to upload {} out of {} files, including: {}".format(len(failures), len(uploads), sample))
 
     def lock_asset(self, project_id: str, meta: OveAssetMeta, worker_name: str) -> None:
         if meta.worker is None or len(meta.worker) == 0 or meta.worker == worker_name:
@@ -60,3 +74,9 @@ class FileController:
             meta.processing_status = str(status)
             meta.processing_error = error_msg
             return self._manager.set_asset_meta(project_id=project_id, asset_id=meta.id, meta=meta)
+
+
+def _log_progress(uploaded: int, total: int) -> None:
+    step = max(total // 10, 1)
+    if uploaded % step == 0 or uploaded == total:
+        logging.info("Uploaded %s/%s files ...", uploaded, total)
@@ -14,6 +14,7 @@ from pymongo.collection import Collection
 
 from common.consts import *
 from common.entities import OveAssetMeta, WorkerStatus, TaskStatus
+from common.invalidation import InvalidationBus, setup_invalidation_collection
 from workers.base.controller import FileController
 
 
@@ -48,6 +49,13 @@ class BaseWorker(ABC):
                                            authMechanism=mongo_config.get(CONFIG_MONGO_MECHANISM))
                 self._worker_collection = self.setup(db_name=mongo_config.get(CONFIG_MONGO_DB), collection_name=mongo_config.get(CONFIG_MONGO_WORKER_COLLECTION))
                 self._worker_queue = self.setup(db_name=mongo_config.get(CONFIG_MONGO_DB), collection_name=mongo_config.get(CONFIG_MONGO_QUEUE_COLLECTION))
+
+                # the asset metadata written by the worker is cached by the AM processes
+                invalidation_collection = setup_invalidation_collection(db=self._client[mongo_config.get(CONFIG_MONGO_DB)],
+                                                                        collection_name=mongo_config.get(CONFIG_MONGO_INVALIDATION_COLLECTION,
+                                                                                                         DEFAULT_INVALIDATION_COLLECTION))
+                if invalidation_collection is not None:
+                    self._file_controller.set_invalidation_publisher(InvalidationBus(collection=invalidation_collection).publish)
                 logging.info("Loaded worker config...")
         except:
             logging.error("Error while trying to load worker config. Error: %s", sys.exc_info()[1])